@@ -91,6 +91,9 @@ PROVIDER_DIRS = {
     PROVIDER_MULTIPLE: ["anthropic", "gemini", "ollama"]
 }
 
+# Provider-independent templates copied into app/llm for every provider
+PROVIDER_COMMON_DIR = "common"
+
 # Map of feature names to their directory names
 FEATURE_DIRS = {
     FEATURE_CACHING: "caching",
@@ -51,21 +51,61 @@ def load_llm_client():
         return lambda x: f"Error: Gemini client not available. Please check your installation."
     {% elif provider == "LLM Local (Ollama)" %}
     try:
-        from app.llm.llm_config import get_ollama_response
+        from app.llm.llm_config import get_ollama_response, warm_up_ollama, OLLAMA_WARM_UP
+        # Load the model in the background so the first question does not wait for it
+        if OLLAMA_WARM_UP:
+            warm_up_ollama(background=True)
         return get_ollama_response
     except ImportError:
         return lambda x: f"Error: Ollama client not available. Please check your installation."
     {% else %}
-    # Default for multiple providers
+    # Multiple providers: route across all of them, hedging slow requests and failing over on errors
     try:
-        from app.llm.anthropic.llm_config import get_anthropic_response
-        return get_anthropic_response
+        from app.llm.router import get_routed_response
+        return get_routed_response
     except ImportError:
         return lambda x: f"Error: LLM client not available. Please check your installation."
     {% endif %}
 
+def load_llm_stream():
+    """Safely load the streaming LLM client"""
+    {% if provider == "Anthropic (Claude)" %}
+    try:
+        from app.llm.llm_config import stream_anthropic_response
+        return stream_anthropic_response
+    except ImportError:
+        return lambda x: iter([f"Error: Anthropic client not available. Please check your installation."])
+    {% elif provider == "Google (Gemini)" %}
+    try:
+        from app.llm.llm_config import stream_gemini_response
+        return stream_gemini_response
+    except ImportError:
+        return lambda x: iter([f"Error: Gemini client not available. Please check your installation."])
+    {% elif provider == "LLM Local (Ollama)" %}
+    try:
+        from app.llm.llm_config import stream_ollama_response
+        return stream_ollama_response
+    except ImportError:
+        return lambda x: iter([f"Error: Ollama client not available. Please check your installation."])
+    {% else %}
+    # Multiple providers: stream from whichever provider produces text first
+    try:
+        from app.llm.router import stream_routed_response
+        return stream_routed_response
+    except ImportError:
+        return lambda x: iter([f"Error: LLM client not available. Please check your installation."])
+    {% endif %}
+
 # Load additional modules safely
 llm_client = load_llm_client()
+llm_stream = load_llm_stream()
+
+def stream_llm_response(prompt: str):
+    """Stream the LLM response as it is generated, ending with an error message if it fails"""
+    try:
+        yield from llm_stream(prompt)
+    except Exception as e:
+        yield f"I'm having trouble connecting to the AI service. Error: {str(e)}"
 
 # Helper functions for memory management
 def save_memory(topic: str, information: str):
@@ -206,8 +246,6 @@ if prompt:
     
     # Get assistant response
     with st.chat_message("assistant"):
-        message_placeholder = st.empty()
-        
         # Get relevant memories
         memories = get_relevant_memories(prompt)
         
@@ -223,14 +261,8 @@ if prompt:
         Use the previous information when relevant to provide a more helpful response.
         """
         
-        # Get response from LLM
-        try:
-            response = llm_client(enhanced_prompt)
-        except Exception as e:
-            response = f"I'm having trouble connecting to the AI service. Error: {str(e)}"
-        
-        # Display the response
-        message_placeholder.markdown(response)
+        # Stream the response from the LLM, rendering tokens as they arrive
+        response = st.write_stream(stream_llm_response(enhanced_prompt))
         
         # Extract potentially useful information to remember
         memory_prompt = f"""
@@ -77,41 +77,82 @@ def load_llm_client():
         return lambda x: f"Error: Gemini client not available. Please check your installation."
     {% elif provider == "LLM Local (Ollama)" %}
     try:
-        from app.llm.llm_config import get_ollama_response
+        from app.llm.llm_config import get_ollama_response, warm_up_ollama, OLLAMA_WARM_UP
+        # Load the model in the background so the first question does not wait for it
+        if OLLAMA_WARM_UP:
+            warm_up_ollama(background=True)
         return get_ollama_response
     except ImportError:
         return lambda x: f"Error: Ollama client not available. Please check your installation."
     {% else %}
-    # Default for multiple providers
+    # Multiple providers: route across all of them, hedging slow requests and failing over on errors
     try:
-        from app.llm.anthropic.llm_config import get_anthropic_response
-        return get_anthropic_response
+        from app.llm.router import get_routed_response
+        return get_routed_response
     except ImportError:
         return lambda x: f"Error: LLM client not available. Please check your installation."
     {% endif %}
 
+def load_llm_stream():
+    """Safely load the streaming LLM client after Streamlit initialization"""
+    {% if provider == "Anthropic (Claude)" %}
+    try:
+        from app.llm.llm_config import stream_anthropic_response
+        return stream_anthropic_response
+    except ImportError:
+        return lambda x: iter([f"Error: Anthropic client not available. Please check your installation."])
+    {% elif provider == "Google (Gemini)" %}
+    try:
+        from app.llm.llm_config import stream_gemini_response
+        return stream_gemini_response
+    except ImportError:
+        return lambda x: iter([f"Error: Gemini client not available. Please check your installation."])
+    {% elif provider == "LLM Local (Ollama)" %}
+    try:
+        from app.llm.llm_config import stream_ollama_response
+        return stream_ollama_response
+    except ImportError:
+        return lambda x: iter([f"Error: Ollama client not available. Please check your installation."])
+    {% else %}
+    # Multiple providers: stream from whichever provider produces text first
+    try:
+        from app.llm.router import stream_routed_response
+        return stream_routed_response
+    except ImportError:
+        return lambda x: iter([f"Error: LLM client not available. Please check your installation."])
+    {% endif %}
+
 # Load LLM client
 llm_client = load_llm_client()
+llm_stream = load_llm_stream()
 
 # Helper functions
-def get_agent_response(prompt, mode):
-    """Get a response from the AI with the appropriate agent mode"""
+def build_agent_prompt(prompt, mode):
+    """Build the full prompt for the appropriate agent mode"""
     system_prompt = AGENT_MODES[mode]["system_prompt"]
     
-    # Build the full prompt
-    full_prompt = f"""
+    return f"""
     {system_prompt}
     
     User query: {prompt}
     
     Please respond in a manner appropriate for your role as a {mode}.
     """
-    
+
+def get_agent_response(prompt, mode):
+    """Get a response from the AI with the appropriate agent mode"""
     try:
-        return llm_client(full_prompt)
+        return llm_client(build_agent_prompt(prompt, mode))
     except Exception as e:
         return f"I'm having trouble generating a response. Error: {str(e)}"
 
+def stream_agent_response(prompt, mode):
+    """Stream a response from the AI as it is generated, ending with an error message if it fails"""
+    try:
+        yield from llm_stream(build_agent_prompt(prompt, mode))
+    except Exception as e:
+        yield f"I'm having trouble generating a response. Error: {str(e)}"
+
 # Sidebar for configuration
 with st.sidebar:
     st.header("Agent Configuration")
@@ -227,12 +268,8 @@ if prompt:
     
     # Get AI response based on current mode
     with st.chat_message("assistant"):
-        message_placeholder = st.empty()
-        
-        response = get_agent_response(prompt, st.session_state.agent_mode)
-        
-        # Display the response
-        message_placeholder.markdown(response)
+        # Stream the response, rendering tokens as they arrive
+        response = st.write_stream(stream_agent_response(prompt, st.session_state.agent_mode))
     
     # Add assistant response to chat history
     st.session_state.messages.append({"role": "assistant", "content": response})
@@ -0,0 +1,256 @@
+"""
+Retention and compaction for stored conversations.
+
+Prunes the conversation store according to age, per-user count and total
+size policies. Can be run once, on a background thread, or from the
+command line:
+
+    python -m app.conversation_persistence.retention --max-age-days 30
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Any
+
+from app.conversation_persistence.persistence import ConversationStore, conversation_store
+
+class RetentionPolicy:
+    """
+    Limits applied by the retention engine. Any limit left as None is not enforced.
+    """
+    
+    def __init__(self,
+                 max_age_days: Optional[float] = None,
+                 max_per_user: Optional[int] = None,
+                 max_total_bytes: Optional[int] = None,
+                 user_key: str = "user_id"):
+        """
+        Initialize the retention policy.
+        
+        Args:
+            max_age_days: Delete conversations older than this many days
+            max_per_user: Keep at most this many conversations per user (newest first)
+            max_total_bytes: Delete the oldest conversations until the store fits in this size
+            user_key: Metadata key identifying the owner of a conversation
+        """
+        self.max_age_days = max_age_days
+        self.max_per_user = max_per_user
+        self.max_total_bytes = max_total_bytes
+        self.user_key = user_key
+
+class RetentionEngine:
+    """
+    Applies a retention policy to a conversation store in bounded batches.
+    """
+    
+    def __init__(self,
+                 store: ConversationStore = conversation_store,
+                 policy: Optional[RetentionPolicy] = None,
+                 batch_size: int = 100,
+                 pause_seconds: float = 0.0):
+        """
+        Initialize the retention engine.
+        
+        Args:
+            store: The conversation store to prune
+            policy: The retention policy to apply
+            batch_size: Maximum number of conversations deleted per batch
+            pause_seconds: Time to sleep between batches to yield to other work
+        """
+        self.store = store
+        self.policy = policy or RetentionPolicy()
+        self.batch_size = max(1, batch_size)
+        self.pause_seconds = pause_seconds
+        self._thread = None
+        self._stop_event = threading.Event()
+        self.last_report = None
+    
+    def _scan(self) -> List[Dict[str, Any]]:
+        """
+        Collect the size, timestamp and owner of every stored conversation.
+        
+        The timestamp is always the file's last modification time, in UTC, so
+        every policy ages conversations from their last save. Metadata is only
+        read from disk when the per-user policy needs the owner.
+        
+        Returns:
+            List[Dict[str, Any]]: One entry per conversation, oldest first
+        """
+        needs_metadata = self.policy.max_per_user is not None
+        entries = []
+        
+        with os.scandir(self.store.storage_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".json") or not entry.is_file():
+                    continue
+                
+                stat = entry.stat()
+                item = {
+                    "id": entry.name[:-len(".json")],
+                    "bytes": stat.st_size,
+                    "timestamp": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+                    "user": None
+                }
+                
+                if needs_metadata:
+                    try:
+                        with open(entry.path, "r", encoding="utf-8") as f:
+                            metadata = json.load(f).get("metadata", {})
+                        item["user"] = metadata.get(self.policy.user_key)
+                    except Exception as e:
+                        print(f"Error reading conversation file {entry.name}: {str(e)}")
+                
+                entries.append(item)
+        
+        entries.sort(key=lambda x: x["timestamp"])
+        return entries
+    
+    def _select_expired(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Pick the conversations that violate the policy.
+        
+        Args:
+            entries: Scanned conversations, oldest first
+        
+        Returns:
+            List[Dict[str, Any]]: Conversations to delete, oldest first
+        """
+        expired = {}
+        
+        if self.policy.max_age_days is not None:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=self.policy.max_age_days)
+            for item in entries:
+                if item["timestamp"] < cutoff:
+                    expired[item["id"]] = item
+        
+        if self.policy.max_per_user is not None:
+            per_user = {}
+            for item in reversed(entries):
+                if item["user"] is None:
+                    continue
+                kept = per_user.get(item["user"], 0)
+                if kept >= self.policy.max_per_user:
+                    expired[item["id"]] = item
+                else:
+                    per_user[item["user"]] = kept + 1
+        
+        if self.policy.max_total_bytes is not None:
+            remaining = sum(item["bytes"] for item in entries if item["id"] not in expired)
+            for item in entries:
+                if remaining <= self.policy.max_total_bytes:
+                    break
+                if item["id"] not in expired:
+                    expired[item["id"]] = item
+                    remaining -= item["bytes"]
+        
+        return [item for item in entries if item["id"] in expired]
+    
+    def run_once(self, max_batches: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Apply the policy once, deleting expired conversations in batches.
+        
+        Args:
+            max_batches: Optional cap on the number of batches processed in this run
+        
+        Returns:
+            Dict[str, Any]: Report with scanned, deleted and reclaimed byte counts
+        """
+        start = time.monotonic()
+        entries = self._scan()
+        expired = self._select_expired(entries)
+        
+        deleted = 0
+        reclaimed = 0
+        batches = 0
+        
+        for offset in range(0, len(expired), self.batch_size):
+            if self._stop_event.is_set() or (max_batches is not None and batches >= max_batches):
+                break
+            
+            for item in expired[offset:offset + self.batch_size]:
+                if self.store.delete_conversation(item["id"]):
+                    deleted += 1
+                    reclaimed += item["bytes"]
+            batches += 1
+            
+            if self.pause_seconds:
+                time.sleep(self.pause_seconds)
+        
+        self.last_report = {
+            "scanned": len(entries),
+            "expired": len(expired),
+            "deleted": deleted,
+            "bytes_reclaimed": reclaimed,
+            "batches": batches,
+            "duration_seconds": round(time.monotonic() - start, 3),
+            "finished_at": datetime.now().isoformat()
+        }
+        return self.last_report
+    
+    def start(self, interval_seconds: float = 3600) -> None:
+        """
+        Run the engine periodically on a background daemon thread.
+        
+        Args:
+            interval_seconds: Time between runs
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        
+        def _loop():
+            while not self._stop_event.is_set():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    print(f"Error during conversation retention: {str(e)}")
+                self._stop_event.wait(interval_seconds)
+        
+        self._thread = threading.Thread(target=_loop, name="conversation-retention", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the background thread.
+        
+        Args:
+            timeout: Maximum time to wait for the current run to finish
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Command-line entry point for a one-off retention run.
+    """
+    parser = argparse.ArgumentParser(description="Prune stored conversations.")
+    parser.add_argument("--storage-dir", default=conversation_store.storage_dir)
+    parser.add_argument("--max-age-days", type=float)
+    parser.add_argument("--max-per-user", type=int)
+    parser.add_argument("--max-total-bytes", type=int)
+    parser.add_argument("--user-key", default="user_id")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args(argv)
+    
+    engine = RetentionEngine(
+        store=ConversationStore(storage_dir=args.storage_dir),
+        policy=RetentionPolicy(
+            max_age_days=args.max_age_days,
+            max_per_user=args.max_per_user,
+            max_total_bytes=args.max_total_bytes,
+            user_key=args.user_key
+        ),
+        batch_size=args.batch_size
+    )
+    report = engine.run_once()
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+PDF extraction benchmark on a generated multi-hundred-page document.
+
+    python -m app.file_uploads.benchmark
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import Dict, Optional
+
+from app.file_uploads.file_processor import FileProcessor
+
+WORDS = [
+    "revenue", "quarter", "forecast", "margin", "customer", "region", "growth", "segment",
+    "operating", "expense", "report", "analysis", "product", "market", "share", "risk",
+]
+
+def make_pdf(path: str, n_pages: int = 500, lines_per_page: int = 60, seed: int = 0) -> None:
+    """
+    Write a text-only PDF with pypdf.
+
+    Args:
+        path: Output path
+        n_pages: Number of pages
+        lines_per_page: Lines of text per page
+        seed: Random seed
+    """
+    from pypdf import PdfWriter
+    from pypdf.generic import ContentStream, DecodedStreamObject, DictionaryObject, NameObject
+
+    rng = random.Random(seed)
+    writer = PdfWriter()
+    font = DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    })
+
+    for page_num in range(n_pages):
+        page = writer.add_blank_page(612, 792)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+        })
+        lines = [f"Page {page_num + 1}"] + [
+            " ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(lines_per_page)
+        ]
+        operators = " T* ".join(f"({line}) Tj" for line in lines)
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 9 Tf 40 760 Td 12 TL {operators} ET".encode())
+        page.replace_contents(ContentStream(stream, writer))
+
+    with open(path, "wb") as f:
+        writer.write(f)
+
+def benchmark_pdf_extraction(n_pages: int = 500, max_workers: Optional[int] = None) -> Dict[str, float]:
+    """
+    Time serial and process-pool extraction of the same generated PDF.
+
+    Args:
+        n_pages: Number of pages in the generated PDF
+        max_workers: Workers for the parallel run, defaults to the CPU count
+
+    Returns:
+        Dict[str, float]: 'serial_seconds', 'parallel_seconds', 'speedup' and 'workers'
+    """
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "report.pdf")
+        make_pdf(path, n_pages)
+        processor = FileProcessor(uploads_dir=directory)
+
+        start = time.perf_counter()
+        serial_text, _ = processor._process_pdf(path, max_workers=1)
+        serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parallel_text, _ = processor._process_pdf(path, max_workers=max_workers)
+        parallel = time.perf_counter() - start
+
+        if serial_text != parallel_text:
+            raise RuntimeError("Parallel extraction returned different text")
+
+        return {
+            "serial_seconds": serial,
+            "parallel_seconds": parallel,
+            "speedup": serial / parallel,
+            "workers": float(max_workers or os.cpu_count() or 1)
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    stats = benchmark_pdf_extraction()
+    print(
+        f"serial: {stats['serial_seconds']:.2f} s  parallel ({stats['workers']:.0f} workers): "
+        f"{stats['parallel_seconds']:.2f} s  speedup: {stats['speedup']:.2f}x"
+    )
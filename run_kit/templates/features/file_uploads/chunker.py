@@ -0,0 +1,206 @@
+"""
+Token-budgeted document chunking: recursive splitting on headings, paragraphs,
+lines, sentences and words, producing items ready for prompting or indexing.
+"""
+
+import re
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Split points from coarsest to finest; each piece ends at the end of a match
+SEPARATORS = [
+    re.compile(r"\n(?=#{1,6} )"),      # Before markdown headings
+    re.compile(r"\n[ \t]*\n\s*"),      # Paragraphs
+    re.compile(r"\n"),                 # Lines
+    re.compile(r"(?<=[.!?])\s+"),      # Sentences
+    re.compile(r"\s+"),                # Words
+]
+
+HEADING_PATTERN = re.compile(r"#{1,6} ")
+
+def approximate_tokens(text: str) -> int:
+    """
+    Estimate a text's token count at about four characters per token.
+
+    Args:
+        text: The text
+
+    Returns:
+        int: The estimated token count
+    """
+    return (len(text) + 3) // 4
+
+class TextChunker:
+    """
+    Splits a stream of pages into chunks of at most `max_tokens` tokens.
+
+    Text is split recursively, trying coarser separators first, into pieces
+    that fit the budget; consecutive pieces are then packed greedily into
+    chunks, carrying up to `overlap_tokens` of trailing pieces into the next
+    chunk. Markdown headings always start a new chunk. Each piece's tokens are
+    counted once, so the pass is linear in the document length.
+    """
+
+    def __init__(self,
+                 max_tokens: int = 512,
+                 overlap_tokens: int = 64,
+                 token_counter: Optional[Callable[[str], int]] = None):
+        """
+        Initialize the chunker.
+
+        Args:
+            max_tokens: Token budget per chunk
+            overlap_tokens: Tokens of trailing context repeated at the start of the next chunk
+            token_counter: Callable returning a text's token count, e.g. a model
+                tokenizer; defaults to `approximate_tokens`
+        """
+        if max_tokens < 1:
+            raise ValueError("max_tokens must be at least 1")
+        if not 0 <= overlap_tokens < max_tokens:
+            raise ValueError("overlap_tokens must be at least 0 and smaller than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.count_tokens = token_counter or approximate_tokens
+
+    def _split(self, text: str, level: int = 0) -> Iterator[Tuple[str, int]]:
+        """
+        Recursively split text into pieces within the token budget.
+
+        Args:
+            text: The text to split
+            level: Index of the first separator to try
+
+        Returns:
+            Iterator[Tuple[str, int]]: (piece, token count); pieces concatenate back to the text
+        """
+        tokens = self.count_tokens(text)
+        if tokens <= self.max_tokens:
+            yield text, tokens
+            return
+
+        if level >= len(SEPARATORS):
+            # No separator left: cut at a character length proportional to the budget
+            width = max(1, len(text) * self.max_tokens // tokens)
+            for start in range(0, len(text), width):
+                piece = text[start:start + width]
+                yield piece, self.count_tokens(piece)
+            return
+
+        start = 0
+        for match in SEPARATORS[level].finditer(text):
+            if start < match.end() < len(text):
+                yield from self._split(text[start:match.end()], level + 1)
+                start = match.end()
+        yield from self._split(text[start:], level + 1)
+
+    def _pieces(self, pages: Iterable[str], separator: str) -> Iterator[Tuple[str, int, int, int, bool]]:
+        """
+        Split pages into budgeted pieces with their position in the document.
+
+        Args:
+            pages: Text per page
+            separator: Text appended to every page, as in the joined document
+
+        Returns:
+            Iterator[Tuple[str, int, int, int, bool]]: (piece, tokens, offset,
+                1-based page, whether the piece starts a markdown section)
+        """
+        offset = 0
+        for page_number, page in enumerate(pages, start=1):
+            page += separator
+            # Split on headings first so every section is packed on its own
+            start = 0
+            sections = []
+            for match in SEPARATORS[0].finditer(page):
+                if start < match.end() < len(page):
+                    sections.append(page[start:match.end()])
+                    start = match.end()
+            sections.append(page[start:])
+
+            for section in sections:
+                is_section = HEADING_PATTERN.match(section) is not None
+                for piece, tokens in self._split(section, 1):
+                    yield piece, tokens, offset, page_number, is_section
+                    offset += len(piece)
+                    is_section = False
+
+    def iter_chunks(self,
+                    pages: Iterable[str],
+                    separator: str = "",
+                    source: Optional[str] = None,
+                    with_pages: bool = False,
+                    id_prefix: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily chunk a document given page by page.
+
+        Args:
+            pages: Text per page, e.g. `FileProcessor.iter_pages`
+            separator: Text between pages, '\\n\\n' for PDFs as in `process_file`
+            source: Optional document name, stored in each chunk's metadata and id
+            with_pages: Whether to record 'page' and 'end_page' (1-based) in the metadata
+            id_prefix: Prefix of chunk ids, defaults to the source
+
+        Returns:
+            Iterator[Dict[str, Any]]: Dicts with 'text', 'metadata' ('chunk', 'offset',
+                'tokens' and optionally 'source', 'page', 'end_page') and 'id', the
+                item format accepted by `VectorDatabase.add_iter`
+        """
+        if id_prefix is None:
+            id_prefix = source
+        buffer: Deque[Tuple[str, int, int, int]] = deque()
+        buffer_tokens = 0
+        fresh = False
+        index = 0
+
+        def _emit() -> Optional[Dict[str, Any]]:
+            nonlocal index
+            text = "".join(piece for piece, _, _, _ in buffer)
+            if not text.strip():
+                return None
+            metadata = {"chunk": index, "offset": buffer[0][2], "tokens": buffer_tokens}
+            if source is not None:
+                metadata["source"] = source
+            if with_pages:
+                metadata["page"] = buffer[0][3]
+                metadata["end_page"] = buffer[-1][3]
+            chunk = {
+                "text": text,
+                "metadata": metadata,
+                "id": f"{id_prefix}:{index}" if id_prefix is not None else str(index)
+            }
+            index += 1
+            return chunk
+
+        for piece, tokens, offset, page, is_section in self._pieces(pages, separator):
+            if buffer and (is_section or buffer_tokens + tokens > self.max_tokens):
+                if fresh:
+                    chunk = _emit()
+                    if chunk is not None:
+                        yield chunk
+                fresh = False
+                # Keep trailing pieces as overlap, but never across a section boundary
+                keep = 0 if is_section else self.overlap_tokens
+                while buffer and (buffer_tokens > keep or buffer_tokens + tokens > self.max_tokens):
+                    buffer_tokens -= buffer.popleft()[1]
+
+            buffer.append((piece, tokens, offset, page))
+            buffer_tokens += tokens
+            fresh = True
+
+        if fresh:
+            chunk = _emit()
+            if chunk is not None:
+                yield chunk
+
+    def chunk_text(self, text: str, source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Chunk a single text.
+
+        Args:
+            text: The text
+            source: Optional document name
+
+        Returns:
+            List[Dict[str, Any]]: The chunks, as in `iter_chunks`
+        """
+        return list(self.iter_chunks([text], source=source))
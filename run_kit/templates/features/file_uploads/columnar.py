@@ -0,0 +1,99 @@
+"""
+Compact columnar representations of tabular uploads: smaller pandas dtypes and Arrow tables.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Any, Iterable, List, Optional
+
+# Text columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+def compact_dtypes(df: pd.DataFrame, max_unique_ratio: float = CATEGORY_MAX_UNIQUE_RATIO) -> pd.DataFrame:
+    """
+    Convert a DataFrame to the smallest dtypes that hold its values exactly.
+
+    Integers are downcast to the narrowest signed type, floats to float32 where
+    that loses no precision, and low-cardinality text columns become categoricals.
+
+    Args:
+        df: The DataFrame
+        max_unique_ratio: Largest distinct/non-null ratio for a text column to
+            become categorical
+
+    Returns:
+        pd.DataFrame: A DataFrame with compacted columns
+    """
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_bool_dtype(series.dtype) or isinstance(series.dtype, pd.CategoricalDtype):
+            columns[column] = series
+        elif pd.api.types.is_integer_dtype(series.dtype) and isinstance(series.dtype, np.dtype):
+            columns[column] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series.dtype) and series.dtype == np.float64:
+            values = series.to_numpy()
+            narrow = values.astype(np.float32)
+            # Downcast only when every value, NaN included, survives the round trip
+            if np.array_equal(narrow.astype(np.float64), values, equal_nan=True):
+                columns[column] = pd.Series(narrow, index=series.index, name=series.name)
+            else:
+                columns[column] = series
+        elif pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype):
+            non_null = series.count()
+            if non_null and series.nunique() / non_null <= max_unique_ratio:
+                columns[column] = series.astype("category")
+            else:
+                columns[column] = series
+        else:
+            columns[column] = series
+
+    return pd.DataFrame(columns, index=df.index)
+
+def to_arrow(df: pd.DataFrame) -> Any:
+    """
+    Convert a DataFrame to an Arrow table; categoricals become dictionary-encoded columns.
+
+    Args:
+        df: The DataFrame
+
+    Returns:
+        pyarrow.Table: The table
+    """
+    import pyarrow as pa
+
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+def check_columns(available: Iterable[Any], columns: Optional[List[str]]) -> None:
+    """
+    Ensure requested columns exist.
+
+    Args:
+        available: Column names of the table
+        columns: Requested columns, None for all
+
+    Raises:
+        KeyError: If any requested column is missing
+    """
+    if columns is None:
+        return
+    available = set(available)
+    missing = [column for column in columns if column not in available]
+    if missing:
+        raise KeyError(f"Unknown columns: {', '.join(str(column) for column in missing)}")
+
+def project(df: pd.DataFrame, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Select columns of a DataFrame, keeping their order as requested.
+
+    Args:
+        df: The DataFrame
+        columns: Columns to keep, None for all
+
+    Returns:
+        pd.DataFrame: The projected DataFrame
+    """
+    check_columns(df.columns, columns)
+    if columns is None:
+        return df
+    return df[list(columns)]
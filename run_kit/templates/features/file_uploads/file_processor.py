@@ -2,10 +2,256 @@
 File processing utilities for handling various file types (PDF, CSV, Excel, etc.).
 """
 
+import hashlib
+import json
 import os
+import signal
+import threading
+import numpy as np
 import pandas as pd
 import tempfile
-from typing import Dict, Any, List, Tuple, Optional, Union
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Tuple, Optional, Union, Iterator, Iterable, Callable
+
+from app.file_uploads.chunker import TextChunker
+from app.file_uploads.columnar import compact_dtypes, project, to_arrow
+from app.file_uploads.processing_cache import ProcessingCache
+
+# Bump whenever processing output changes, so cached results from older code are ignored
+PROCESSOR_VERSION = "3"
+
+# PDFs with fewer pages are extracted in-process; starting a pool costs more than it saves
+PDF_PARALLEL_MIN_PAGES = 32
+
+# Seconds a single PDF page may take before it is skipped
+PDF_PAGE_TIMEOUT = 30.0
+
+# Characters per "page" yielded for plain text and markdown files
+TEXT_PAGE_SIZE = 64 * 1024
+
+# CSV files at least this large are streamed in chunks when a sample is requested
+CSV_CHUNKED_MIN_BYTES = 64 * 1024 * 1024
+
+# Rows per chunk when streaming a CSV, and rows kept as the in-memory sample
+CSV_CHUNK_ROWS = 100_000
+CSV_SAMPLE_ROWS = 1000
+
+# Bytes copied at a time when saving an upload
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Maps original upload names to content hashes, inside uploads_dir
+UPLOAD_INDEX_FILE = "names.json"
+
+# Total estimated memory of files processed at once by `process_many`
+INGEST_MEMORY_BUDGET = 1024 * 1024 * 1024
+
+# Estimated peak memory while processing, as a multiple of the file size
+INGEST_MEMORY_FACTORS = {"csv": 6, "xlsx": 12, "pdf": 3}
+INGEST_DEFAULT_MEMORY_FACTOR = 2
+
+# A BaseException so that pypdf's internal `except Exception` handlers cannot swallow it
+class _PageTimeout(BaseException):
+    pass
+
+def _raise_page_timeout(signum, frame):
+    raise _PageTimeout()
+
+def _page_timeout_supported() -> bool:
+    """
+    Check whether PDF page timeouts can be enforced in the current thread.
+    
+    Returns:
+        bool: True where SIGALRM is available and this is the main thread
+    """
+    return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+def _iter_pdf_pages(file_path: str,
+                    start: int = 0,
+                    end: Optional[int] = None,
+                    page_timeout: Optional[float] = None) -> Iterator[Optional[str]]:
+    """
+    Lazily extract the text of a range of PDF pages, one page at a time.
+    
+    Args:
+        file_path: Path to the PDF file
+        start: First page index
+        end: End page index (exclusive), defaults to the last page
+        page_timeout: Optional seconds allowed per page; only enforced where SIGALRM
+            is available and on the main thread (always the case in pool workers)
+        
+    Returns:
+        Iterator[Optional[str]]: Text per page, None for pages that timed out
+    """
+    import pypdf
+    
+    use_timer = bool(page_timeout) and _page_timeout_supported()
+    if use_timer:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_page_timeout)
+    
+    try:
+        with open(file_path, "rb") as f:
+            pdf = pypdf.PdfReader(f)
+            for page_num in range(start, len(pdf.pages) if end is None else end):
+                try:
+                    if use_timer:
+                        signal.setitimer(signal.ITIMER_REAL, page_timeout)
+                    text = pdf.pages[page_num].extract_text() or ""
+                except _PageTimeout:
+                    text = None
+                    # The interrupted parse may have left the reader inconsistent
+                    pdf = pypdf.PdfReader(f)
+                finally:
+                    if use_timer:
+                        signal.setitimer(signal.ITIMER_REAL, 0)
+                yield text
+    finally:
+        if use_timer:
+            signal.signal(signal.SIGALRM, previous_handler)
+
+def _extract_pages(file_path: str, start: int, end: int, page_timeout: Optional[float] = None) -> List[Optional[str]]:
+    """
+    Extract the text of a range of PDF pages. Runs in worker processes, so the
+    file is reopened rather than passing a parsed reader between processes.
+    
+    Args:
+        file_path: Path to the PDF file
+        start: First page index
+        end: End page index (exclusive)
+        page_timeout: Optional seconds allowed per page
+        
+    Returns:
+        List[Optional[str]]: Text per page, None for pages that timed out
+    """
+    return list(_iter_pdf_pages(file_path, start, end, page_timeout))
+
+def _pdf_metadata(pdf: Any) -> Dict[str, Any]:
+    """
+    Read document-level metadata from an open PDF.
+    
+    Args:
+        pdf: A pypdf PdfReader
+        
+    Returns:
+        Dict[str, Any]: Page count, title, author and creation date
+    """
+    return {
+        "pages": len(pdf.pages),
+        "title": pdf.metadata.title if pdf.metadata and pdf.metadata.title else None,
+        "author": pdf.metadata.author if pdf.metadata and pdf.metadata.author else None,
+        "creation_date": pdf.metadata.creation_date if pdf.metadata and pdf.metadata.creation_date else None,
+    }
+
+class CsvProfile:
+    """
+    Incrementally computed CSV metadata: row count, column types, null counts
+    and numeric statistics, updated one chunk at a time.
+    """
+    
+    def __init__(self):
+        """
+        Initialize an empty profile.
+        """
+        self.rows = 0
+        self.column_names = []
+        self.dtypes = {}
+        self.null_counts = {}
+        # Per numeric column: [count, mean, M2, min, max], merged with Chan's parallel algorithm
+        self.numeric = {}
+    
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        Fold a chunk of rows into the profile.
+        
+        Args:
+            chunk: The next rows of the CSV
+        """
+        if not self.column_names:
+            self.column_names = list(chunk.columns)
+        self.rows += len(chunk)
+        
+        for column, count in chunk.isna().sum().items():
+            self.null_counts[column] = self.null_counts.get(column, 0) + int(count)
+        for column, dtype in chunk.dtypes.items():
+            self.dtypes.setdefault(column, set()).add(dtype)
+        
+        numeric = chunk.select_dtypes("number")
+        if numeric.empty:
+            return
+        counts = numeric.count().to_numpy(dtype=np.float64)
+        means = numeric.mean().to_numpy(dtype=np.float64)
+        m2 = (numeric.var(ddof=0).to_numpy(dtype=np.float64) * counts)
+        minimums = numeric.min().to_numpy(dtype=np.float64)
+        maximums = numeric.max().to_numpy(dtype=np.float64)
+        
+        for i, column in enumerate(numeric.columns):
+            n_b = counts[i]
+            if not n_b:
+                continue
+            if column not in self.numeric:
+                self.numeric[column] = [n_b, means[i], m2[i], minimums[i], maximums[i]]
+                continue
+            n_a, mean_a, m2_a, min_a, max_a = self.numeric[column]
+            n = n_a + n_b
+            delta = means[i] - mean_a
+            self.numeric[column] = [
+                n,
+                mean_a + delta * n_b / n,
+                m2_a + m2[i] + delta * delta * n_a * n_b / n,
+                min(min_a, minimums[i]),
+                max(max_a, maximums[i]),
+            ]
+    
+    def _dtype(self, column: str) -> str:
+        """
+        Resolve a column's type across chunks.
+        
+        Args:
+            column: The column name
+            
+        Returns:
+            str: The dtype name shared by all chunks, 'float64' for mixed numeric
+                types and 'object' otherwise
+        """
+        dtypes = self.dtypes.get(column, set())
+        if len(dtypes) == 1:
+            return next(iter(dtypes)).name
+        if all(pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) for dtype in dtypes):
+            return "float64"
+        return "object"
+    
+    def metadata(self) -> Dict[str, Any]:
+        """
+        Get the profile in the shape of `process_file` CSV metadata.
+        
+        Returns:
+            Dict[str, Any]: rows, columns and column_names, plus dtypes, null_counts
+                and per numeric column count/mean/std/min/max
+        """
+        dtypes = {column: self._dtype(column) for column in self.column_names}
+        stats = {}
+        for column, (count, mean, m2, minimum, maximum) in self.numeric.items():
+            # Columns that turned non-numeric in a later chunk have no meaningful statistics
+            if dtypes.get(column) == "object":
+                continue
+            stats[column] = {
+                "count": int(count),
+                "mean": float(mean),
+                "std": float(np.sqrt(m2 / (count - 1))) if count > 1 else None,
+                "min": float(minimum),
+                "max": float(maximum),
+            }
+        
+        return {
+            "rows": self.rows,
+            "columns": len(self.column_names),
+            "column_names": self.column_names,
+            "dtypes": dtypes,
+            "null_counts": {column: self.null_counts.get(column, 0) for column in self.column_names},
+            "stats": stats,
+        }
 
 # File types
 class FileType:
@@ -45,45 +291,150 @@ class FileProcessor:
     Process various file types for analysis with LLMs.
     """
     
-    def __init__(self, uploads_dir: str = None):
+    def __init__(self, uploads_dir: str = None, cache_dir: str = None, use_cache: bool = True):
         """
         Initialize the file processor.
         
         Args:
             uploads_dir: Directory to store uploaded files
+            cache_dir: Directory for cached processing results, defaults to
+                '.cache' inside uploads_dir
+            use_cache: Whether to reuse results for files whose content was
+                processed before
         """
         self.uploads_dir = uploads_dir or os.path.join("app", "data", "uploads")
         os.makedirs(self.uploads_dir, exist_ok=True)
+        self.cache = (
+            ProcessingCache(cache_dir or os.path.join(self.uploads_dir, ".cache"), PROCESSOR_VERSION)
+            if use_cache else None
+        )
+        self._index_lock = threading.Lock()
+    
+    def _read_upload_index(self) -> Dict[str, str]:
+        """
+        Read the mapping of original upload names to content hashes.
+        
+        Returns:
+            Dict[str, str]: Content hash per original name
+        """
+        index_path = os.path.join(self.uploads_dir, UPLOAD_INDEX_FILE)
+        if not os.path.exists(index_path):
+            return {}
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error reading upload index: {str(e)}")
+            return {}
+    
+    def _write_upload_index(self, index: Dict[str, str]) -> None:
+        """
+        Atomically replace the upload name index.
+        
+        Args:
+            index: Content hash per original name
+        """
+        index_path = os.path.join(self.uploads_dir, UPLOAD_INDEX_FILE)
+        temp_path = index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+        os.replace(temp_path, index_path)
     
     def save_uploaded_file(self, uploaded_file) -> str:
         """
         Save an uploaded file from Streamlit to disk.
         
+        The upload is copied in UPLOAD_CHUNK_SIZE blocks while being hashed and
+        stored as `uploads_dir/<sha256>/<original name>`, so files sharing a name
+        no longer overwrite each other and identical content is stored once: a
+        repeated upload returns the existing file, and the same content under a
+        new name is hard-linked. The latest hash for each name is recorded in
+        UPLOAD_INDEX_FILE.
+        
         Args:
             uploaded_file: Streamlit UploadedFile object
             
         Returns:
             str: Path to the saved file
         """
-        # Create a temporary file to store the upload
-        temp_dir = self.uploads_dir
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        # Generate a unique file path
-        file_path = os.path.join(temp_dir, uploaded_file.name)
+        os.makedirs(self.uploads_dir, exist_ok=True)
+        file_name = os.path.basename(uploaded_file.name)
         
-        # Write the file
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+        # Copy to a temporary file while hashing, without materializing the whole upload
+        digest = hashlib.sha256()
+        uploaded_file.seek(0)
+        fd, temp_path = tempfile.mkstemp(dir=self.uploads_dir, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for block in iter(lambda: uploaded_file.read(UPLOAD_CHUNK_SIZE), b""):
+                    digest.update(block)
+                    f.write(block)
             
+            file_hash = digest.hexdigest()
+            content_dir = os.path.join(self.uploads_dir, file_hash)
+            file_path = os.path.join(content_dir, file_name)
+            os.makedirs(content_dir, exist_ok=True)
+            
+            if not os.path.exists(file_path):
+                existing = [name for name in os.listdir(content_dir) if not name.startswith(".")]
+                try:
+                    if not existing:
+                        raise FileNotFoundError()
+                    os.link(os.path.join(content_dir, existing[0]), file_path)
+                except OSError:
+                    # First copy of this content, or a filesystem without hard links
+                    os.replace(temp_path, file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        
+        with self._index_lock:
+            index = self._read_upload_index()
+            index[file_name] = file_hash
+            self._write_upload_index(index)
+        
+        if self.cache is not None:
+            self.cache.remember_hash(file_path, file_hash)
+        
         return file_path
     
-    def process_file(self, file_path: str) -> Dict[str, Any]:
+    def get_uploaded_file_path(self, file_name: str) -> Optional[str]:
+        """
+        Find the stored copy of the latest upload with a given name.
+        
+        Args:
+            file_name: Original name of the uploaded file
+            
+        Returns:
+            Optional[str]: Path to the stored file, or None if it was never uploaded
+        """
+        file_hash = self._read_upload_index().get(os.path.basename(file_name))
+        if file_hash is None:
+            return None
+        file_path = os.path.join(self.uploads_dir, file_hash, os.path.basename(file_name))
+        return file_path if os.path.exists(file_path) else None
+    
+    def process_file(self,
+                     file_path: str,
+                     max_workers: Optional[int] = None,
+                     sample_large_csv: bool = False) -> Dict[str, Any]:
         """
         Process a file based on its type and return relevant content.
         
+        Results are cached by content hash, so re-processing the same file, or
+        an identical file uploaded under another name, loads the stored result.
+        
+        Tables are returned exactly, so CSV and Excel files are loaded whole and
+        peak memory grows with the file size (see INGEST_MEMORY_FACTORS); only
+        `sample_large_csv` bounds it, for large CSVs.
+        
         Args:
             file_path: Path to the file
+            max_workers: Maximum worker processes for PDF extraction, defaults to the CPU count
+            sample_large_csv: Stream CSV files of at least CSV_CHUNKED_MIN_BYTES and
+                return only their first CSV_SAMPLE_ROWS rows, flagged by
+                metadata['sampled'], instead of loading them whole; metadata still
+                covers every row
             
         Returns:
             Dict[str, Any]: Processed content and metadata
@@ -99,9 +450,25 @@ class FileProcessor:
             "metadata": {}
         }
         
+        sample = (
+            sample_large_csv
+            and file_type == FileType.CSV
+            and os.path.getsize(file_path) >= CSV_CHUNKED_MIN_BYTES
+        )
+        # Samples are cached apart from full results, so neither is returned in place of the other
+        cache_type = f"{file_type}-sample" if sample else file_type
+        
+        file_hash = None
+        if self.cache is not None:
+            file_hash = self.cache.file_hash(file_path)
+            cached = self.cache.get(file_hash, cache_type)
+            if cached is not None:
+                result["content"], result["metadata"] = cached
+                return result
+        
         # Process based on file type
         if file_type == FileType.CSV:
-            content, metadata = self._process_csv(file_path)
+            content, metadata = self._process_csv(file_path, chunked=sample)
             result["content"] = content
             result["metadata"] = metadata
             
@@ -111,7 +478,7 @@ class FileProcessor:
             result["metadata"] = metadata
             
         elif file_type == FileType.PDF:
-            content, metadata = self._process_pdf(file_path)
+            content, metadata = self._process_pdf(file_path, max_workers=max_workers)
             result["content"] = content
             result["metadata"] = metadata
             
@@ -121,66 +488,268 @@ class FileProcessor:
             result["content"] = text
             result["metadata"] = {"char_count": len(text)}
         
+        # Failed extractions come back without metadata and are retried next time
+        if file_hash is not None and result["metadata"]:
+            self.cache.put(file_hash, cache_type, result["content"], result["metadata"])
+        
         return result
     
-    def _process_csv(self, file_path: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    def process_many(self, 
+                     file_paths: Iterable[str], 
+                     max_workers: Optional[int] = None,
+                     memory_budget: int = INGEST_MEMORY_BUDGET) -> Iterator[Dict[str, Any]]:
+        """
+        Process several files concurrently, yielding each result as it finishes.
+        
+        Text and markdown files, and files already known to be in the processing
+        cache, are handled in-process; CSV, Excel and PDF files go to a process
+        pool. Files are hashed in the workers rather than one after another up
+        front, unless their hash is already known (e.g. from the upload). A file
+        is only dispatched while the number of files in flight is below
+        `max_workers` and their estimated memory (file size times a per-type
+        factor) fits `memory_budget`; a file larger than the whole budget runs
+        alone. Failures are reported per file and do not stop the batch; files
+        in flight when a worker crashes are retried once, each alone in a fresh
+        pool, so a crashing file cannot take others down with it.
+        
+        Args:
+            file_paths: Paths of the files to process
+            max_workers: Maximum files processed at once, defaults to the CPU count
+            memory_budget: Maximum total estimated bytes for the files in flight
+            
+        Returns:
+            Iterator[Dict[str, Any]]: Per file, in completion order: 'file_path',
+                'result' (as from `process_file`, None on failure), 'error' (None on
+                success), 'seconds' spent processing and 'cached'
+        """
+        max_workers = max(1, max_workers or os.cpu_count() or 1)
+        cache_dir = self.cache.cache_dir if self.cache is not None else None
+        
+        def _report(file_path, result=None, error=None, seconds=0.0, cached=False):
+            return {
+                "file_path": file_path,
+                "result": result,
+                "error": error,
+                "seconds": seconds,
+                "cached": cached
+            }
+        
+        # Cheap files and cache hits first, so their results are not queued behind the pool
+        pending = deque()
+        for file_path in file_paths:
+            start = time.perf_counter()
+            try:
+                file_type = FileType.get_type(os.path.basename(file_path))
+                file_hash = self.cache.known_hash(file_path) if self.cache is not None else None
+                cached = file_hash is not None and self.cache.contains(file_hash, file_type)
+                if cached or file_type not in INGEST_MEMORY_FACTORS:
+                    result = self.process_file(file_path)
+                    yield _report(file_path, result, seconds=time.perf_counter() - start, cached=cached)
+                else:
+                    estimate = os.path.getsize(file_path) * INGEST_MEMORY_FACTORS[file_type]
+                    pending.append((file_path, estimate))
+            except Exception as e:
+                yield _report(file_path, error=str(e), seconds=time.perf_counter() - start)
+        
+        executor = None
+        in_flight = {}
+        memory_in_flight = 0
+        retried = set()
+        try:
+            while pending or in_flight:
+                while pending:
+                    if in_flight:
+                        # Retried files run alone; otherwise respect the concurrency and memory budgets
+                        solo = pending[0][0] in retried or any(path in retried for path, _ in in_flight.values())
+                        if solo or len(in_flight) >= max_workers or memory_in_flight + pending[0][1] > memory_budget:
+                            break
+                    file_path, estimate = pending.popleft()
+                    if executor is None:
+                        executor = ProcessPoolExecutor(max_workers=max_workers)
+                    future = executor.submit(_process_in_worker, self.uploads_dir, cache_dir, file_path)
+                    in_flight[future] = (file_path, estimate)
+                    memory_in_flight += estimate
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path, estimate = in_flight.pop(future)
+                    memory_in_flight -= estimate
+                    try:
+                        result, seconds, cached = future.result()
+                        yield _report(file_path, result, seconds=seconds, cached=cached)
+                    except BrokenProcessPool as e:
+                        # A worker died (e.g. out of memory); later files get a fresh pool
+                        if executor is not None:
+                            executor.shutdown(wait=False)
+                            executor = None
+                        if file_path not in retried:
+                            retried.add(file_path)
+                            pending.appendleft((file_path, estimate))
+                        else:
+                            yield _report(file_path, error=f"Worker process failed: {str(e)}")
+                    except Exception as e:
+                        yield _report(file_path, error=str(e))
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _process_csv(self, 
+                    file_path: str, 
+                    chunked: bool = False,
+                    chunksize: int = CSV_CHUNK_ROWS) -> Tuple[pd.DataFrame, Dict[str, Any]]:
         """
         Process a CSV file.
         
+        In chunked mode the file is streamed `chunksize` rows at a time, metadata
+        is computed incrementally and only the first CSV_SAMPLE_ROWS rows are
+        returned, so memory stays bounded regardless of file size.
+        
         Args:
             file_path: Path to the CSV file
+            chunked: Whether to stream the file and keep only a sample
+            chunksize: Rows per chunk when streaming
             
         Returns:
-            Tuple[pd.DataFrame, Dict[str, Any]]: DataFrame and metadata
+            Tuple[pd.DataFrame, Dict[str, Any]]: DataFrame (a head sample in chunked
+                mode, flagged by metadata['sampled']) and metadata
         """
-        df = pd.read_csv(file_path)
+        profile = CsvProfile()
+        if not chunked:
+            df = pd.read_csv(file_path)
+            profile.update(df)
+            metadata = profile.metadata()
+            metadata["sampled"] = False
+            return df, metadata
         
-        metadata = {
-            "rows": len(df),
-            "columns": len(df.columns),
-            "column_names": list(df.columns)
-        }
+        sample = []
+        sampled_rows = 0
+        with pd.read_csv(file_path, chunksize=chunksize) as reader:
+            for chunk in reader:
+                profile.update(chunk)
+                if sampled_rows < CSV_SAMPLE_ROWS:
+                    sample.append(chunk.head(CSV_SAMPLE_ROWS - sampled_rows))
+                    sampled_rows += len(sample[-1])
         
+        df = pd.concat(sample) if sample else pd.read_csv(file_path, nrows=0)
+        metadata = profile.metadata()
+        metadata["sampled"] = True
         return df, metadata
     
-    def _process_excel(self, file_path: str) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Any]]:
+    def _excel_dimensions(self, file_path: str) -> Optional[Dict[str, Dict[str, Any]]]:
         """
-        Process an Excel file.
+        Read sheet names, dimensions and header rows of an .xlsx workbook
+        without loading cell data, using openpyxl's read-only mode.
         
         Args:
             file_path: Path to the Excel file
             
         Returns:
-            Tuple[Dict[str, pd.DataFrame], Dict[str, Any]]: Dict of DataFrames and metadata
+            Optional[Dict[str, Dict[str, Any]]]: 'rows', 'columns' and 'column_names'
+                per sheet, or None if the file is not .xlsx or openpyxl is missing
         """
-        excel_file = pd.ExcelFile(file_path)
-        
-        # Read all sheets
-        dfs = {}
-        for sheet_name in excel_file.sheet_names:
-            dfs[sheet_name] = pd.read_excel(file_path, sheet_name=sheet_name)
+        if not file_path.lower().endswith((".xlsx", ".xlsm")):
+            return None
+        try:
+            import openpyxl
+        except ImportError:
+            return None
         
-        metadata = {
-            "sheets": excel_file.sheet_names,
-            "sheet_count": len(excel_file.sheet_names),
-            "sheet_details": {
-                sheet: {
-                    "rows": len(dfs[sheet]),
-                    "columns": len(dfs[sheet].columns),
-                    "column_names": list(dfs[sheet].columns)
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            details = {}
+            for sheet in workbook.worksheets:
+                header = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+                column_names = [
+                    value if value is not None else f"Unnamed: {i}"
+                    for i, value in enumerate(header)
+                ]
+                total_rows = sheet.max_row
+                if total_rows is None:
+                    # The workbook does not declare its dimensions; count rows by streaming them
+                    total_rows = sum(1 for _ in sheet.iter_rows(values_only=True))
+                details[sheet.title] = {
+                    "rows": max(total_rows - 1, 0) if column_names else 0,
+                    "columns": len(column_names),
+                    "column_names": column_names
                 }
-                for sheet in dfs
+            return details
+        finally:
+            workbook.close()
+    
+    def _process_excel(self, 
+                      file_path: str, 
+                      max_rows: Optional[int] = None,
+                      metadata_only: bool = False) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Any]]:
+        """
+        Process an Excel file, parsing each sheet of the open workbook once.
+        
+        Args:
+            file_path: Path to the Excel file
+            max_rows: Optional cap on data rows loaded per sheet, e.g. for previews
+            metadata_only: Only read sheet names and dimensions, without cell data
+                (.xlsx only; other formats are parsed and the data discarded)
+            
+        Returns:
+            Tuple[Dict[str, pd.DataFrame], Dict[str, Any]]: Dict of DataFrames (empty when
+                metadata_only) and metadata. With max_rows, 'rows' is still the sheet's
+                full row count where the workbook declares it, and 'rows_loaded' is added.
+        """
+        dimensions = self._excel_dimensions(file_path) if metadata_only or max_rows is not None else None
+        
+        if metadata_only and dimensions is not None:
+            sheet_names = list(dimensions)
+            return {}, {
+                "sheets": sheet_names,
+                "sheet_count": len(sheet_names),
+                "sheet_details": dimensions
             }
+        
+        with pd.ExcelFile(file_path) as excel_file:
+            sheet_names = excel_file.sheet_names
+            # One parse call over the already-open workbook reads every sheet once
+            dfs = excel_file.parse(sheet_name=sheet_names, nrows=max_rows)
+        
+        sheet_details = {}
+        for sheet in sheet_names:
+            sheet_details[sheet] = {
+                "rows": len(dfs[sheet]),
+                "columns": len(dfs[sheet].columns),
+                "column_names": list(dfs[sheet].columns)
+            }
+            if max_rows is not None:
+                sheet_details[sheet]["rows_loaded"] = len(dfs[sheet])
+                if dimensions is not None and sheet in dimensions:
+                    sheet_details[sheet]["rows"] = dimensions[sheet]["rows"]
+        
+        metadata = {
+            "sheets": sheet_names,
+            "sheet_count": len(sheet_names),
+            "sheet_details": sheet_details
         }
         
+        if metadata_only:
+            return {}, metadata
         return dfs, metadata
     
-    def _process_pdf(self, file_path: str) -> Tuple[str, Dict[str, Any]]:
+    def _process_pdf(self, 
+                    file_path: str, 
+                    max_workers: Optional[int] = None,
+                    page_timeout: Optional[float] = PDF_PAGE_TIMEOUT) -> Tuple[str, Dict[str, Any]]:
         """
         Process a PDF file.
         
+        Large PDFs are split into page ranges extracted by a process pool, and
+        pages that exceed `page_timeout` are skipped and listed in the
+        metadata under 'timed_out_pages' (1-based). The timeout relies on
+        SIGALRM, which only works on the main thread; called from another
+        thread, e.g. a Streamlit script, small PDFs are extracted in a
+        single-worker pool too, so the timeout still applies.
+        
         Args:
             file_path: Path to the PDF file
+            max_workers: Maximum worker processes, defaults to the CPU count;
+                1 extracts in-process where the page timeout can be enforced
+            page_timeout: Seconds allowed per page, None to disable
             
         Returns:
             Tuple[str, Dict[str, Any]]: Extracted text and metadata
@@ -191,86 +760,321 @@ class FileProcessor:
             return "PDF processing requires pypdf. Install with: pip install pypdf", {}
         
         # Extract text from PDF
-        text = ""
         metadata = {}
         
         try:
             with open(file_path, "rb") as f:
-                pdf = pypdf.PdfReader(f)
-                metadata = {
-                    "pages": len(pdf.pages),
-                    "title": pdf.metadata.title if pdf.metadata and pdf.metadata.title else None,
-                    "author": pdf.metadata.author if pdf.metadata and pdf.metadata.author else None,
-                    "creation_date": pdf.metadata.creation_date if pdf.metadata and pdf.metadata.creation_date else None,
-                }
-                
-                for page_num in range(len(pdf.pages)):
-                    page = pdf.pages[page_num]
-                    text += page.extract_text() + "\n\n"
+                metadata = _pdf_metadata(pypdf.PdfReader(f))
+            
+            page_count = metadata["pages"]
+            workers = min(max_workers or os.cpu_count() or 1, page_count)
+            parallel = page_count >= PDF_PARALLEL_MIN_PAGES and workers > 1
+            # Pool workers run on their main thread, where the timeout can be enforced
+            timeout_needs_pool = (
+                bool(page_timeout)
+                and page_count > 0
+                and hasattr(signal, "setitimer")
+                and not _page_timeout_supported()
+            )
+            if not parallel and not timeout_needs_pool:
+                pages = _extract_pages(file_path, 0, page_count, page_timeout)
+            else:
+                if not parallel:
+                    workers = 1
+                # Several ranges per worker keep the pool busy when page costs are uneven
+                size = -(-page_count // (workers * 4))
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = [
+                        executor.submit(_extract_pages, file_path, start, min(start + size, page_count), page_timeout)
+                        for start in range(0, page_count, size)
+                    ]
+                    pages = [page for future in futures for page in future.result()]
                 
         except Exception as e:
             return f"Error processing PDF: {str(e)}", {}
         
+        metadata["timed_out_pages"] = [i + 1 for i, page in enumerate(pages) if page is None]
+        text = "".join((page or "") + "\n\n" for page in pages)
+        
         return text, metadata
     
+    def load_table(self,
+                   file_path: str,
+                   columns: Optional[List[str]] = None,
+                   sheet_name: Optional[str] = None,
+                   as_arrow: bool = False) -> Any:
+        """
+        Load a CSV or Excel sheet with compact dtypes, optionally only some columns.
+
+        The file is processed once and its tables persisted as Parquet in the
+        processing cache; later loads read just the requested columns from there.
+        Only this method returns compact dtypes: narrower integers can overflow in
+        arithmetic, so `process_file` keeps the dtypes the file was parsed with.
+
+        Args:
+            file_path: Path to a CSV or Excel file
+            columns: Columns to load, None for all
+            sheet_name: Excel sheet, defaults to the first sheet
+            as_arrow: Return a pyarrow.Table instead of a DataFrame
+
+        Returns:
+            Any: The DataFrame or pyarrow.Table
+        """
+        file_type = FileType.get_type(os.path.basename(file_path))
+        if file_type not in [FileType.CSV, FileType.EXCEL]:
+            raise ValueError(f"Tables are not available for {file_type} files")
+
+        result = self.process_file(file_path)
+
+        if self.cache is not None:
+            table = self.cache.get_frame(self.cache.file_hash(file_path), file_type, sheet_name, columns, as_arrow)
+            if table is not None:
+                return table
+
+        content = result["content"]
+        if file_type == FileType.EXCEL:
+            if sheet_name is None:
+                sheet_name = result["metadata"]["sheets"][0]
+            content = content[sheet_name]
+        df = compact_dtypes(project(content, columns))
+        return to_arrow(df) if as_arrow else df
+
+    def get_excel_metadata(self, file_path: str) -> Dict[str, Any]:
+        """
+        Read an Excel workbook's sheet names and dimensions without loading cell data.
+        
+        .xlsx workbooks are opened in openpyxl's read-only mode and only their header
+        rows are read; other formats (e.g. .xls) are parsed and the data discarded.
+        
+        Args:
+            file_path: Path to the Excel file
+            
+        Returns:
+            Dict[str, Any]: 'sheets', 'sheet_count' and per sheet 'rows', 'columns'
+                and 'column_names' under 'sheet_details'
+        """
+        return self._process_excel(file_path, metadata_only=True)[1]
+    
+    def iter_pages(self, file_path: str, page_timeout: Optional[float] = PDF_PAGE_TIMEOUT) -> Iterator[str]:
+        """
+        Lazily yield a document's text page by page, so only one page is held in memory.
+        
+        PDF pages are extracted as they are consumed; pages that exceed the timeout
+        yield an empty string. Text and markdown files are read in pages of about
+        TEXT_PAGE_SIZE characters, split on line boundaries.
+        
+        Args:
+            file_path: Path to a PDF, text or markdown file
+            page_timeout: Seconds allowed per PDF page, None to disable. Pages are
+                extracted in the calling thread, so this is only enforced on the main
+                thread (it relies on SIGALRM) and not in Streamlit scripts, which run
+                on another thread; use `process_file` there
+            
+        Returns:
+            Iterator[str]: The text of each page
+        """
+        file_type = FileType.get_type(os.path.basename(file_path))
+        
+        if file_type == FileType.PDF:
+            for text in _iter_pdf_pages(file_path, page_timeout=page_timeout):
+                yield text or ""
+        
+        elif file_type in [FileType.TEXT, FileType.MARKDOWN]:
+            with open(file_path, "r", encoding="utf-8") as f:
+                lines = []
+                length = 0
+                for line in f:
+                    lines.append(line)
+                    length += len(line)
+                    if length >= TEXT_PAGE_SIZE:
+                        yield "".join(lines)
+                        lines = []
+                        length = 0
+                if lines:
+                    yield "".join(lines)
+        
+        else:
+            raise ValueError(f"Streaming is not supported for {file_type} files")
+    
+    def iter_text_chunks(self, file_path: str, size: int = 2000, overlap: int = 200) -> Iterator[str]:
+        """
+        Lazily yield fixed-size, overlapping text chunks of a document, e.g. for indexing.
+        
+        PDF pages are separated by a blank line, as in `process_file`, and chunks may span pages.
+        
+        Args:
+            file_path: Path to a PDF, text or markdown file
+            size: Characters per chunk
+            overlap: Characters shared by consecutive chunks
+            
+        Returns:
+            Iterator[str]: The chunks, in document order
+        """
+        if not 0 <= overlap < size:
+            raise ValueError("overlap must be at least 0 and smaller than size")
+        
+        separator = "\n\n" if FileType.get_type(os.path.basename(file_path)) == FileType.PDF else ""
+        buffer = ""
+        emitted = False
+        for page in self.iter_pages(file_path):
+            buffer += page + separator
+            position = 0
+            while len(buffer) - position >= size:
+                yield buffer[position:position + size]
+                position += size - overlap
+                emitted = True
+            buffer = buffer[position:]
+        
+        # The tail is only new content if it extends past the last chunk's overlap
+        if buffer.strip() and (not emitted or len(buffer) > overlap):
+            yield buffer
+    
+    def iter_chunks(self,
+                    file_path: str,
+                    max_tokens: int = 512,
+                    overlap_tokens: int = 64,
+                    token_counter: Optional[Callable[[str], int]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily split a document into token-budgeted chunks for prompting or indexing.
+        
+        Pages are streamed from `iter_pages` and split on headings, paragraphs,
+        lines and sentences (see `TextChunker`). Chunk ids are prefixed with the
+        file's content hash when the processing cache is enabled, so re-indexing
+        the same content reuses the same ids. The output can be passed straight
+        to `VectorDatabase.add_iter`, which batches it.
+        
+        Args:
+            file_path: Path to a PDF, text or markdown file
+            max_tokens: Token budget per chunk
+            overlap_tokens: Tokens repeated between consecutive chunks
+            token_counter: Optional callable returning a text's token count,
+                defaults to an estimate of four characters per token
+            
+        Returns:
+            Iterator[Dict[str, Any]]: Dicts with 'text', 'metadata' (source, chunk,
+                offset, tokens and, for PDFs, 1-based page and end_page) and 'id'
+        """
+        file_name = os.path.basename(file_path)
+        is_pdf = FileType.get_type(file_name) == FileType.PDF
+        chunker = TextChunker(max_tokens, overlap_tokens, token_counter)
+        
+        return chunker.iter_chunks(
+            self.iter_pages(file_path),
+            separator="\n\n" if is_pdf else "",
+            source=file_name,
+            with_pages=is_pdf,
+            id_prefix=self.cache.file_hash(file_path) if self.cache is not None else file_name
+        )
+    
     def get_file_summary(self, file_path: str) -> str:
         """
         Generate a summary description of the file.
         
+        PDF, text and markdown previews only read the first page.
+        
         Args:
             file_path: Path to the file
             
         Returns:
             str: Summary of the file
         """
-        result = self.process_file(file_path)
-        file_type = result["file_type"]
+        file_name = os.path.basename(file_path)
+        file_type = FileType.get_type(file_name)
         
-        if file_type == FileType.CSV:
-            df = result["content"]
-            metadata = result["metadata"]
+        if file_type == FileType.PDF:
+            try:
+                import pypdf
+                with open(file_path, "rb") as f:
+                    metadata = _pdf_metadata(pypdf.PdfReader(f))
+                pages = self.iter_pages(file_path)
+                try:
+                    text = next(pages, "")
+                finally:
+                    pages.close()
+            except ImportError:
+                return "PDF processing requires pypdf. Install with: pip install pypdf"
+            except Exception as e:
+                return f"Error processing PDF: {str(e)}"
+            
             return (
-                f"CSV file: {result['file_name']}\n"
-                f"Rows: {metadata['rows']}, Columns: {metadata['columns']}\n"
-                f"Columns: {', '.join(metadata['column_names'])}\n"
-                f"Sample data:\n{df.head(5).to_string()}"
+                f"PDF file: {file_name}\n"
+                f"Pages: {metadata.get('pages', 'Unknown')}\n"
+                f"Title: {metadata.get('title', 'Unknown')}\n"
+                f"Author: {metadata.get('author', 'Unknown')}\n"
+                f"Content preview: {text[:500] + '...' if len(text) > 500 else text}"
             )
+        
+        elif file_type in [FileType.TEXT, FileType.MARKDOWN]:
+            pages = self.iter_pages(file_path)
+            try:
+                text = next(pages, "")
+            finally:
+                pages.close()
             
-        elif file_type == FileType.EXCEL:
-            dfs = result["content"]
-            metadata = result["metadata"]
-            summary = [f"Excel file: {result['file_name']}"]
+            return (
+                f"Text file: {file_name}\n"
+                f"Size: {os.path.getsize(file_path)} bytes\n"
+                f"Content preview: {text[:500] + '...' if len(text) > 500 else text}"
+            )
+        
+        if file_type == FileType.EXCEL:
+            # Previews only need a few rows per sheet
+            dfs, metadata = self._process_excel(file_path, max_rows=5)
+            summary = [f"Excel file: {file_name}"]
             summary.append(f"Sheets: {', '.join(metadata['sheets'])}")
             
             for sheet_name, sheet_df in dfs.items():
                 sheet_info = metadata["sheet_details"][sheet_name]
                 summary.append(f"\nSheet: {sheet_name}")
                 summary.append(f"Rows: {sheet_info['rows']}, Columns: {sheet_info['columns']}")
-                summary.append(f"Columns: {', '.join(sheet_info['column_names'])}")
+                summary.append(f"Columns: {', '.join(str(name) for name in sheet_info['column_names'])}")
                 summary.append(f"Sample data:\n{sheet_df.head(5).to_string()}")
             
             return "\n".join(summary)
-            
-        elif file_type == FileType.PDF:
-            text = result["content"]
+        
+        # Previews only need the first rows, so large CSVs are sampled
+        result = self.process_file(file_path, sample_large_csv=True)
+        
+        if file_type == FileType.CSV:
+            df = result["content"]
             metadata = result["metadata"]
             return (
-                f"PDF file: {result['file_name']}\n"
-                f"Pages: {metadata.get('pages', 'Unknown')}\n"
-                f"Title: {metadata.get('title', 'Unknown')}\n"
-                f"Author: {metadata.get('author', 'Unknown')}\n"
-                f"Content preview: {text[:500]}..." if len(text) > 500 else text
-            )
-            
-        elif file_type in [FileType.TEXT, FileType.MARKDOWN]:
-            text = result["content"]
-            return (
-                f"Text file: {result['file_name']}\n"
-                f"Size: {result['metadata'].get('char_count', 'Unknown')} characters\n"
-                f"Content preview: {text[:500]}..." if len(text) > 500 else text
+                f"CSV file: {result['file_name']}\n"
+                f"Rows: {metadata['rows']}, Columns: {metadata['columns']}\n"
+                f"Columns: {', '.join(metadata['column_names'])}\n"
+                f"Sample data:\n{df.head(5).to_string()}"
             )
         
         return f"File: {result['file_name']} (No preview available for {file_type} files)"
 
+# Per-process FileProcessor used by `process_many` pool workers
+_worker_processor = None
+
+def _process_in_worker(uploads_dir: str, cache_dir: Optional[str], file_path: str) -> Tuple[Dict[str, Any], float, bool]:
+    """
+    Process one file in a pool worker, hashing it there for the cache lookup.
+    
+    Args:
+        uploads_dir: The parent processor's uploads directory
+        cache_dir: The parent processor's cache directory, None if caching is disabled
+        file_path: Path to the file
+        
+    Returns:
+        Tuple[Dict[str, Any], float, bool]: The `process_file` result, seconds spent
+            and whether it came from the processing cache
+    """
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = FileProcessor(uploads_dir, cache_dir, use_cache=cache_dir is not None)
+    
+    start = time.perf_counter()
+    cache = _worker_processor.cache
+    # The hash is remembered, so `process_file` does not read the file again for it
+    file_type = FileType.get_type(os.path.basename(file_path))
+    cached = cache is not None and cache.contains(cache.file_hash(file_path), file_type)
+    # The pool already runs one file per CPU, so PDFs are extracted in-process
+    result = _worker_processor.process_file(file_path, max_workers=1)
+    return result, time.perf_counter() - start, cached
+
 # Singleton instance
 file_processor = FileProcessor()
\ No newline at end of file
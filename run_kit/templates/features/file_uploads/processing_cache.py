@@ -0,0 +1,317 @@
+"""
+On-disk cache of file processing results keyed by file content hash.
+"""
+
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import pandas as pd
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.file_uploads.columnar import check_columns, compact_dtypes, project, to_arrow
+
+# Bytes read at a time while hashing files
+HASH_BLOCK_SIZE = 1024 * 1024
+
+def file_sha256(file_path: str) -> str:
+    """
+    Hash a file's content without loading it whole.
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ProcessingCache:
+    """
+    Stores processed content and metadata per (content hash, file type, processor version).
+
+    DataFrames are stored with compact dtypes (see `compact_dtypes`), as Parquet
+    when pyarrow is available and the frame is Parquet-compatible, and pickled
+    otherwise; text is stored as UTF-8. `get` restores the dtypes the frames
+    were stored with, so only `get_frame` returns the compact representation.
+    """
+
+    def __init__(self, cache_dir: str, version: str):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding one subdirectory per cached result
+            version: Processor version; bumping it invalidates earlier entries
+        """
+        self.cache_dir = cache_dir
+        self.version = version
+        os.makedirs(cache_dir, exist_ok=True)
+        # (path, size, mtime) -> content hash, so unchanged files are not re-hashed on every rerun
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    def file_hash(self, file_path: str) -> str:
+        """
+        Get the content hash of a file, reusing the last hash while it is unmodified.
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            str: Hex SHA-256 digest
+        """
+        digest = self.known_hash(file_path)
+        if digest is None:
+            digest = file_sha256(file_path)
+            self.remember_hash(file_path, digest)
+        return digest
+
+    def known_hash(self, file_path: str) -> Optional[str]:
+        """
+        Get the last hash of a file if it is unmodified since, without reading it.
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            Optional[str]: Hex SHA-256 digest, or None if the file must be hashed
+        """
+        stat = os.stat(file_path)
+        key = (os.path.realpath(file_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            return self._hashes.get(key)
+
+    def remember_hash(self, file_path: str, digest: str) -> None:
+        """
+        Record a file's content hash computed elsewhere, e.g. while it was saved.
+
+        Args:
+            file_path: Path to the file
+            digest: Hex SHA-256 digest of its current content
+        """
+        stat = os.stat(file_path)
+        key = (os.path.realpath(file_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            self._hashes[key] = digest
+
+    def _entry_dir(self, file_hash: str, file_type: str) -> str:
+        """
+        Get the directory of a cache entry.
+
+        Args:
+            file_hash: Content hash
+            file_type: Processed file type
+
+        Returns:
+            str: The entry directory
+        """
+        return os.path.join(self.cache_dir, f"{file_hash}-{file_type}-v{self.version}")
+
+    @staticmethod
+    def _write_frame(df: pd.DataFrame, path: str) -> str:
+        """
+        Write a DataFrame with compact dtypes as Parquet, or pickle if Parquet is
+        unavailable or unsupported.
+
+        Args:
+            df: The DataFrame
+            path: Path without extension
+
+        Returns:
+            str: File name written
+        """
+        df = compact_dtypes(df)
+        try:
+            # Parquet would silently turn non-string column names (e.g. numeric Excel headers) into strings
+            if not all(isinstance(column, str) for column in df.columns):
+                raise TypeError("Parquet requires string column names")
+            df.to_parquet(path + ".parquet")
+            return os.path.basename(path) + ".parquet"
+        except Exception:
+            # pyarrow missing, or columns Parquet cannot represent (e.g. mixed types)
+            if os.path.exists(path + ".parquet"):
+                os.remove(path + ".parquet")
+            df.to_pickle(path + ".pkl")
+            return os.path.basename(path) + ".pkl"
+
+    @staticmethod
+    def _read_frame(path: str, dtypes: Optional[List[Tuple[Any, Any]]] = None) -> pd.DataFrame:
+        """
+        Read a DataFrame written by `_write_frame`.
+
+        Args:
+            path: Path to the file
+            dtypes: Optional (column, dtype) pairs to convert the compact columns back to
+
+        Returns:
+            pd.DataFrame: The DataFrame
+        """
+        df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_pickle(path)
+        if dtypes:
+            df = df.astype(dict(dtypes))
+        return df
+
+    def contains(self, file_hash: str, file_type: str) -> bool:
+        """
+        Check whether a result is cached, without loading it.
+
+        Args:
+            file_hash: Content hash
+            file_type: Processed file type
+
+        Returns:
+            bool: True if a complete entry exists
+        """
+        return os.path.exists(os.path.join(self._entry_dir(file_hash, file_type), "index.pkl"))
+
+    def get(self, file_hash: str, file_type: str) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        """
+        Look up a cached result.
+
+        Args:
+            file_hash: Content hash
+            file_type: Processed file type
+
+        Returns:
+            Optional[Tuple[Any, Dict[str, Any]]]: (content, metadata), or None on a miss
+        """
+        entry = self._entry_dir(file_hash, file_type)
+        index_path = os.path.join(entry, "index.pkl")
+        if not os.path.exists(index_path):
+            return None
+
+        try:
+            with open(index_path, "rb") as f:
+                index = pickle.load(f)
+
+            kind = index["kind"]
+            if kind == "text":
+                with open(os.path.join(entry, index["files"]), "r", encoding="utf-8") as f:
+                    content = f.read()
+            elif kind == "frame":
+                content = self._read_frame(os.path.join(entry, index["files"]), index["dtypes"])
+            elif kind == "sheets":
+                content = {
+                    sheet: self._read_frame(os.path.join(entry, name), index["dtypes"][sheet])
+                    for sheet, name in index["files"]
+                }
+            else:
+                content = index["files"]
+            return content, index["metadata"]
+        except Exception as e:
+            # Remove the unreadable entry, so it is rebuilt once instead of failing on every run
+            print(f"Error reading processing cache, discarding entry: {str(e)}")
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+
+    def get_frame(self,
+                  file_hash: str,
+                  file_type: str,
+                  sheet_name: Optional[str] = None,
+                  columns: Optional[List[str]] = None,
+                  as_arrow: bool = False) -> Optional[Any]:
+        """
+        Load one cached table with compact dtypes, reading only the requested columns from Parquet.
+
+        Args:
+            file_hash: Content hash
+            file_type: Processed file type
+            sheet_name: Sheet of a cached workbook, defaults to the first sheet
+            columns: Columns to load, None for all
+            as_arrow: Return a pyarrow.Table instead of a DataFrame
+
+        Returns:
+            Optional[Any]: The DataFrame or Arrow table, or None if no table is cached
+        """
+        entry = self._entry_dir(file_hash, file_type)
+        index_path = os.path.join(entry, "index.pkl")
+        if not os.path.exists(index_path):
+            return None
+
+        with open(index_path, "rb") as f:
+            index = pickle.load(f)
+        if index["kind"] == "frame":
+            name = index["files"]
+        elif index["kind"] == "sheets" and index["files"]:
+            sheets = dict(index["files"])
+            if sheet_name is not None and sheet_name not in sheets:
+                raise KeyError(f"Unknown sheet: {sheet_name}")
+            name = sheets[sheet_name] if sheet_name is not None else index["files"][0][1]
+        else:
+            return None
+
+        path = os.path.join(entry, name)
+        if not path.endswith(".parquet"):
+            # `project` raises the same KeyError for unknown columns as the Parquet branch
+            df = project(pd.read_pickle(path), columns)
+            return to_arrow(df) if as_arrow else df
+
+        import pyarrow.parquet as pq
+
+        # One open file serves both the column check and the read
+        parquet_file = pq.ParquetFile(path)
+        check_columns(parquet_file.schema_arrow.names, columns)
+        table = parquet_file.read(columns=columns, use_pandas_metadata=not as_arrow)
+        if as_arrow:
+            # Drop the stored pandas index, which Arrow exposes as a regular column
+            return table.drop_columns([column for column in table.column_names if column.startswith("__index_level_")])
+        return table.to_pandas()
+
+    def put(self, file_hash: str, file_type: str, content: Any, metadata: Dict[str, Any]) -> None:
+        """
+        Store a result, replacing any previous entry atomically.
+
+        Args:
+            file_hash: Content hash
+            file_type: Processed file type
+            content: Text, a DataFrame, a dict of DataFrames, or another picklable value
+            metadata: Processing metadata
+        """
+        entry = self._entry_dir(file_hash, file_type)
+        staging = tempfile.mkdtemp(dir=self.cache_dir, prefix=".staging-")
+        # The dtypes frames had before compaction, restored by `get`
+        dtypes = None
+        try:
+            if isinstance(content, str):
+                kind, files = "text", "content.txt"
+                with open(os.path.join(staging, files), "w", encoding="utf-8") as f:
+                    f.write(content)
+            elif isinstance(content, pd.DataFrame):
+                kind, files = "frame", self._write_frame(content, os.path.join(staging, "content"))
+                dtypes = list(content.dtypes.items())
+            elif isinstance(content, dict) and all(isinstance(df, pd.DataFrame) for df in content.values()):
+                kind = "sheets"
+                files = [
+                    (sheet, self._write_frame(df, os.path.join(staging, f"sheet_{i}")))
+                    for i, (sheet, df) in enumerate(content.items())
+                ]
+                dtypes = {sheet: list(df.dtypes.items()) for sheet, df in content.items()}
+            else:
+                kind, files = "value", content
+
+            # The index is written last, so a readable index means a complete entry
+            with open(os.path.join(staging, "index.pkl"), "wb") as f:
+                pickle.dump({"kind": kind, "files": files, "dtypes": dtypes, "metadata": metadata}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            if os.path.exists(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+            os.replace(staging, entry)
+        except Exception as e:
+            print(f"Error writing processing cache: {str(e)}")
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def clear(self) -> None:
+        """
+        Remove every cached result.
+        """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._lock:
+            self._hashes.clear()
@@ -0,0 +1,200 @@
+"""
+Incremental BM25 keyword index used for hybrid (keyword + vector) retrieval.
+"""
+
+import heapq
+import math
+import os
+import pickle
+import re
+from collections import Counter
+from typing import List, Optional, Tuple, Iterable
+
+from app.db.journal import Journal
+
+# Words, numbers and identifiers such as ERR-042, v1.2.3 or foo_bar/baz
+TOKEN_PATTERN = re.compile(r"\w+(?:[-.:/]\w+)*", re.UNICODE)
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase terms, keeping compound identifiers intact
+    and also indexing their parts.
+
+    Args:
+        text: The text to tokenize
+
+    Returns:
+        List[str]: The terms
+    """
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(part for part in re.split(r"[-.:/]", token) if part)
+    return terms
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuse several rankings of IDs with reciprocal rank fusion.
+
+    Args:
+        rankings: Lists of IDs, best first
+        k: Damping constant; higher values flatten the contribution of top ranks
+
+    Returns:
+        List[Tuple[str, float]]: (id, fused score) pairs, best first
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda x: x[1], reverse=True)
+
+class BM25Index:
+    """
+    An in-memory inverted index with Okapi BM25 scoring, persisted with pickle.
+
+    Documents can be added and removed one at a time without rebuilding.
+    Changes are appended to a journal next to the pickle, which is only
+    rewritten once the journal outgrows it.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize the index, loading it from disk if a saved copy exists.
+
+        Args:
+            path: Optional file to persist the index to
+            k1: Term frequency saturation parameter
+            b: Document length normalization parameter
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.doc_terms = {}
+        self.doc_lengths = {}
+        self.total_length = 0
+        self.journal = Journal(path + ".journal") if path else None
+        self._saved_bytes = 0
+
+        if path and os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    self.postings, self.doc_terms, self.doc_lengths, self.total_length = pickle.load(f)
+                self._saved_bytes = os.path.getsize(path)
+            except Exception as e:
+                print(f"Error loading keyword index: {str(e)}")
+
+        if self.journal is not None:
+            for record in self.journal.replay():
+                if record["op"] == "add":
+                    self.add(record["ids"], record["texts"], save=False)
+                elif record["op"] == "delete":
+                    for doc_id in record["ids"]:
+                        self._remove(doc_id)
+
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+
+    def save(self) -> None:
+        """
+        Persist the whole index if a path was given, clearing the journal.
+        """
+        if not self.path:
+            return
+        with open(self.path + ".tmp", "wb") as f:
+            pickle.dump((self.postings, self.doc_terms, self.doc_lengths, self.total_length), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(self.path + ".tmp", self.path)
+        self._saved_bytes = os.path.getsize(self.path)
+        self.journal.clear()
+
+    def _persist(self, record: dict) -> None:
+        """
+        Journal a change, or save in full once the journal outgrows the last save.
+
+        Args:
+            record: The change, as replayed on load
+        """
+        if self.journal is None:
+            return
+        if self.journal.due(self._saved_bytes):
+            self.save()
+        else:
+            self.journal.append(record)
+
+    def _remove(self, doc_id: str) -> None:
+        """
+        Remove one document's postings.
+
+        Args:
+            doc_id: ID of the document
+        """
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            docs = self.postings[term]
+            del docs[doc_id]
+            if not docs:
+                del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(doc_id)
+
+    def add(self, ids: List[str], texts: List[str], save: bool = True) -> None:
+        """
+        Index documents, replacing any previous version with the same ID.
+
+        Args:
+            ids: Document IDs
+            texts: Document texts
+            save: Whether to persist the change now
+        """
+        for doc_id, text in zip(ids, texts):
+            self._remove(doc_id)
+            terms = Counter(tokenize(text or ""))
+            self.doc_terms[doc_id] = terms
+            self.doc_lengths[doc_id] = sum(terms.values())
+            self.total_length += self.doc_lengths[doc_id]
+            for term, tf in terms.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+        if save:
+            self._persist({"op": "add", "ids": list(ids), "texts": list(texts)})
+
+    def delete(self, ids: List[str]) -> None:
+        """
+        Remove documents from the index.
+
+        Args:
+            ids: Document IDs
+        """
+        for doc_id in ids:
+            self._remove(doc_id)
+        self._persist({"op": "delete", "ids": list(ids)})
+
+    def search(self, query: str, n_results: int = 10) -> List[Tuple[str, float]]:
+        """
+        Score documents against a query.
+
+        Args:
+            query: The query text
+            n_results: Maximum number of results
+
+        Returns:
+            List[Tuple[str, float]]: (id, BM25 score) pairs, best first
+        """
+        n_docs = len(self.doc_terms)
+        if not n_docs:
+            return []
+
+        avg_length = self.total_length / n_docs or 1.0
+        scores = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+        return heapq.nlargest(n_results, scores.items(), key=lambda x: x[1])
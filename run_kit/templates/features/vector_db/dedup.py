@@ -0,0 +1,217 @@
+"""
+SimHash signatures for near-duplicate detection during ingestion.
+"""
+
+import hashlib
+import os
+import pickle
+import re
+from collections import Counter
+import numpy as np
+from typing import List, Optional
+
+from app.db.journal import Journal
+
+SIGNATURE_BITS = 64
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+_BIT_POSITIONS = np.arange(SIGNATURE_BITS, dtype=np.uint64)
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """
+    Compute a 64-bit SimHash over word shingles. Similar texts get signatures
+    that differ in few bits.
+
+    Args:
+        text: The text to sign
+        shingle_size: Number of consecutive words per shingle
+
+    Returns:
+        int: The signature
+    """
+    words = WORD_PATTERN.findall((text or "").lower())
+    shingles = Counter(
+        " ".join(words[i:i + shingle_size])
+        for i in range(max(1, len(words) - shingle_size + 1))
+    )
+
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big") for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+    weights = np.fromiter(shingles.values(), dtype=np.float64, count=len(shingles))
+
+    # Each shingle votes +weight for its set bits and -weight for its clear bits
+    bits = (hashes[:, None] >> _BIT_POSITIONS) & np.uint64(1)
+    votes = weights @ (2.0 * bits - 1.0)
+    return sum(1 << int(position) for position in np.flatnonzero(votes > 0))
+
+def hamming_distance(a: int, b: int) -> int:
+    """
+    Count the bits in which two signatures differ.
+
+    Args:
+        a: First signature
+        b: Second signature
+
+    Returns:
+        int: Number of differing bits
+    """
+    return bin(a ^ b).count("1")
+
+class SimHashIndex:
+    """
+    A banded index of SimHash signatures, persisted with pickle.
+
+    Signatures are split into `max_distance + 1` bands, so any two signatures
+    within `max_distance` bits share at least one band exactly and lookups
+    only compare against that band's bucket. Changes are appended to a
+    journal next to the pickle, which is only rewritten once the journal
+    outgrows it.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_distance: int = 6):
+        """
+        Initialize the index, loading it from disk if a saved copy exists.
+
+        Args:
+            path: Optional file to persist the index to
+            max_distance: Largest Hamming distance still considered a near-duplicate
+        """
+        self.path = path
+        self.max_distance = max_distance
+        self.signatures = {}
+
+        n_bands = max_distance + 1
+        self._band_bits = -(-SIGNATURE_BITS // n_bands)
+        self._buckets = [{} for _ in range(n_bands)]
+        self.journal = Journal(path + ".journal") if path else None
+        self._saved_bytes = 0
+
+        if path and os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    signatures = pickle.load(f)
+                self.add(list(signatures), list(signatures.values()), save=False)
+                self._saved_bytes = os.path.getsize(path)
+            except Exception as e:
+                print(f"Error loading near-duplicate index: {str(e)}")
+
+        if self.journal is not None:
+            for record in self.journal.replay():
+                if record["op"] == "add":
+                    self.add(record["ids"], record["signatures"], save=False)
+                elif record["op"] == "delete":
+                    for doc_id in record["ids"]:
+                        self._remove(doc_id)
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def _bands(self, signature: int) -> List[int]:
+        """
+        Split a signature into its band values.
+
+        Args:
+            signature: The signature
+
+        Returns:
+            List[int]: One value per band
+        """
+        mask = (1 << self._band_bits) - 1
+        return [(signature >> (band * self._band_bits)) & mask for band in range(len(self._buckets))]
+
+    def save(self) -> None:
+        """
+        Persist all signatures if a path was given, clearing the journal.
+        """
+        if not self.path:
+            return
+        with open(self.path + ".tmp", "wb") as f:
+            pickle.dump(self.signatures, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(self.path + ".tmp", self.path)
+        self._saved_bytes = os.path.getsize(self.path)
+        self.journal.clear()
+
+    def _persist(self, record: dict) -> None:
+        """
+        Journal a change, or save in full once the journal outgrows the last save.
+
+        Args:
+            record: The change, as replayed on load
+        """
+        if self.journal is None:
+            return
+        if self.journal.due(self._saved_bytes):
+            self.save()
+        else:
+            self.journal.append(record)
+
+    def _remove(self, doc_id: str) -> None:
+        """
+        Remove one document's signature from its buckets.
+
+        Args:
+            doc_id: ID of the document
+        """
+        signature = self.signatures.pop(doc_id, None)
+        if signature is None:
+            return
+        for buckets, value in zip(self._buckets, self._bands(signature)):
+            bucket = buckets[value]
+            bucket.discard(doc_id)
+            if not bucket:
+                del buckets[value]
+
+    def add(self, ids: List[str], signatures: List[int], save: bool = True) -> None:
+        """
+        Index signatures, replacing any previous signature with the same ID.
+
+        Args:
+            ids: Document IDs
+            signatures: Their SimHash signatures
+            save: Whether to persist the change now
+        """
+        for doc_id, signature in zip(ids, signatures):
+            self._remove(doc_id)
+            self.signatures[doc_id] = signature
+            for buckets, value in zip(self._buckets, self._bands(signature)):
+                buckets.setdefault(value, set()).add(doc_id)
+        if save:
+            self._persist({"op": "add", "ids": list(ids), "signatures": [int(signature) for signature in signatures]})
+
+    def delete(self, ids: List[str]) -> None:
+        """
+        Remove documents from the index.
+
+        Args:
+            ids: Document IDs
+        """
+        for doc_id in ids:
+            self._remove(doc_id)
+        self._persist({"op": "delete", "ids": list(ids)})
+
+    def find(self, signature: int, exclude: Optional[str] = None) -> Optional[str]:
+        """
+        Find the closest indexed document within `max_distance` bits.
+
+        Args:
+            signature: The signature to look up
+            exclude: Optional ID to ignore, e.g. the document itself
+
+        Returns:
+            Optional[str]: ID of the nearest near-duplicate, or None
+        """
+        best_id, best_distance = None, self.max_distance + 1
+        candidates = set()
+        for buckets, value in zip(self._buckets, self._bands(signature)):
+            candidates.update(buckets.get(value, ()))
+        candidates.discard(exclude)
+
+        for doc_id in candidates:
+            distance = hamming_distance(signature, self.signatures[doc_id])
+            if distance < best_distance:
+                best_id, best_distance = doc_id, distance
+        return best_id
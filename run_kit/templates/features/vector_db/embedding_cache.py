@@ -0,0 +1,219 @@
+"""
+Persistent embedding cache keyed by embedding model and text content hash.
+"""
+
+import functools
+import hashlib
+import os
+import sqlite3
+import threading
+import types
+import numpy as np
+from typing import List, Dict, Any, Optional, Callable
+
+class EmbeddingCache:
+    """
+    A SQLite-backed store of embeddings keyed by (model id, text hash).
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the cache.
+
+        Args:
+            path: Path to the SQLite cache file
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, hash))"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        """
+        Hash a text for use as a cache key.
+
+        Args:
+            text: The text to hash
+
+        Returns:
+            str: Hex digest of the text
+        """
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up cached embeddings.
+
+        Args:
+            model: Identifier of the embedding model
+            hashes: Text hashes to look up
+
+        Returns:
+            Dict[str, np.ndarray]: Cached float32 embeddings by hash; misses are absent
+        """
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for text_hash, vector in self._db.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *chunk]
+                ):
+                    found[text_hash] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def set_many(self, model: str, vectors: Dict[str, np.ndarray]) -> None:
+        """
+        Store embeddings in one transaction.
+
+        Args:
+            model: Identifier of the embedding model
+            vectors: Embeddings by text hash
+        """
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                [
+                    (model, text_hash, np.asarray(vector, dtype=np.float32).tobytes())
+                    for text_hash, vector in vectors.items()
+                ]
+            )
+
+    def clear(self, model: Optional[str] = None) -> None:
+        """
+        Remove cached embeddings.
+
+        Args:
+            model: Only remove embeddings of this model if given
+        """
+        with self._lock, self._db:
+            if model is None:
+                self._db.execute("DELETE FROM embeddings")
+            else:
+                self._db.execute("DELETE FROM embeddings WHERE model = ?", (model,))
+
+def model_id_for(embedding_function: Any) -> str:
+    """
+    Derive a cache namespace for an embedding function.
+
+    Functions are identified by module and qualified name (lambdas also by
+    line), partials by their wrapped function and bound arguments, and
+    callable objects by their class plus model name and dimension when exposed.
+    Pass an explicit `model_id` when this cannot tell two models apart.
+
+    Args:
+        embedding_function: The embedding function
+
+    Returns:
+        str: The cache namespace
+    """
+    if isinstance(embedding_function, functools.partial):
+        parts = [f"partial({model_id_for(embedding_function.func)})"]
+        parts += [_argument_id(value) for value in embedding_function.args]
+        parts += [f"{key}={_argument_id(value)}" for key, value in sorted(embedding_function.keywords.items())]
+        return ";".join(parts)
+
+    # Functions and methods carry their own qualified name; instances of classes do not
+    function = getattr(embedding_function, "__func__", embedding_function)
+    qualname = getattr(function, "__qualname__", None)
+    if isinstance(qualname, str):
+        name = f"{getattr(function, '__module__', None) or 'builtins'}.{qualname}"
+        if "<lambda>" in qualname:
+            name += f":{function.__code__.co_firstlineno}"
+        if isinstance(embedding_function, types.MethodType):
+            return ";".join([name] + _model_attributes(embedding_function.__self__))
+        return name
+
+    cls = type(embedding_function)
+    return ";".join([f"{cls.__module__}.{cls.__qualname__}"] + _model_attributes(embedding_function))
+
+def _model_attributes(obj: Any) -> List[str]:
+    """
+    Collect the model name and dimension an embedding object exposes.
+
+    Args:
+        obj: The embedding object
+
+    Returns:
+        List[str]: 'attribute=value' parts
+    """
+    parts = []
+    for attribute in ("model_name", "model", "dim"):
+        value = getattr(obj, attribute, None)
+        if isinstance(value, (str, int)):
+            parts.append(f"{attribute}={value}")
+    return parts
+
+def _argument_id(value: Any) -> str:
+    """
+    Describe an argument bound by functools.partial.
+
+    Args:
+        value: The argument
+
+    Returns:
+        str: The model id of callables, otherwise the repr
+    """
+    if callable(value):
+        return model_id_for(value)
+    return repr(value)
+
+class CachedEmbeddingFunction:
+    """
+    Wraps an embedding function so that cached embeddings are reused and
+    only unseen texts reach the model, in a single batch.
+    """
+
+    def __init__(self,
+                 embedding_function: Callable[[List[str]], List[Any]],
+                 cache: EmbeddingCache,
+                 model_id: Optional[str] = None):
+        """
+        Initialize the wrapper.
+
+        Args:
+            embedding_function: The embedding function to wrap
+            cache: The cache to consult and fill
+            model_id: Cache namespace, derived from the embedding function if not given
+        """
+        self.embedding_function = embedding_function
+        self.cache = cache
+        self.model_id = model_id or model_id_for(embedding_function)
+
+    def __call__(self, input: List[str]) -> np.ndarray:
+        """
+        Embed a batch of texts, computing only cache misses.
+
+        Args:
+            input: The texts to embed
+
+        Returns:
+            np.ndarray: One float32 row per text
+        """
+        if not input:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        hashes = [EmbeddingCache.text_hash(text) for text in input]
+        found = self.cache.get_many(self.model_id, list(set(hashes)))
+
+        # Embed each distinct missing text once
+        missing = {}
+        for text_hash, text in zip(hashes, input):
+            if text_hash not in found and text_hash not in missing:
+                missing[text_hash] = text
+
+        if missing:
+            computed = np.asarray(self.embedding_function(list(missing.values())), dtype=np.float32)
+            computed = dict(zip(missing.keys(), computed))
+            self.cache.set_many(self.model_id, computed)
+            found.update(computed)
+
+        return np.stack([found[text_hash] for text_hash in hashes])
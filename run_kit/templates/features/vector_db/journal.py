@@ -0,0 +1,91 @@
+"""
+Append-only operation journal for indexes that are persisted as whole files.
+
+Each write appends one JSON line instead of rewriting the index. The index
+is rewritten in full, and the journal cleared, only once the journal has
+grown as large as the last full save, so total I/O stays linear in the
+amount of data written while every write is durable as soon as it returns.
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterator
+
+# The journal is compacted into a full save once it exceeds both this size
+# and the size of the last full save
+JOURNAL_MIN_BYTES = 1 << 20
+
+class Journal:
+    """
+    A JSON-lines file of operations, replayed on load over the last full save.
+
+    Operations must be idempotent, since a crash between a full save and
+    `clear()` replays operations the saved index already contains.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the journal.
+
+        Args:
+            path: Path to the journal file
+        """
+        self.path = path
+        self.size = os.path.getsize(path) if os.path.exists(path) else 0
+
+        # Terminate a line torn by a crash so the next record starts on its own line
+        if self.size:
+            with open(path, "rb+") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+                    self.size += 1
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """
+        Append an operation.
+
+        Args:
+            record: JSON-serializable operation
+        """
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(line)
+        self.size += len(line)
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """
+        Read the journaled operations in order, skipping lines torn by a crash.
+
+        Returns:
+            Iterator[Dict[str, Any]]: The operations
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    print(f"Skipping incomplete journal entry in {self.path}")
+
+    def due(self, saved_bytes: int) -> bool:
+        """
+        Check whether the index should be saved in full and the journal cleared.
+
+        Args:
+            saved_bytes: Size of the last full save
+
+        Returns:
+            bool: True once the journal outgrows the full save
+        """
+        return self.size > max(saved_bytes, JOURNAL_MIN_BYTES)
+
+    def clear(self) -> None:
+        """
+        Remove the journal after a full save.
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.size = 0
@@ -0,0 +1,1151 @@
+"""
+Dependency-free local vector indexes used when ChromaDB is not installed
+or when a collection is too large to hold in memory.
+
+Both indexes expose the subset of the ChromaDB collection API used by
+VectorDatabase (add, upsert, query, get, delete, count) on top of NumPy.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import numpy as np
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from app.db.journal import Journal
+from app.db.quantization import QUANTIZERS, ProductQuantizer
+
+# Tokens used by the hashing embedding function
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Quantized indexes scan full vectors until this many rows exist, then train
+# the quantizer on them; smaller samples give poor codebooks and int8 ranges
+QUANTIZER_MIN_TRAINING_ROWS = 2048
+
+# Maximum number of live rows sampled when (re)training a quantizer
+QUANTIZER_TRAINING_SAMPLE = 20000
+
+# Comparison operators supported in `where` filters
+_OPERATORS = {
+    "$eq": lambda a, b: a == b,
+    "$ne": lambda a, b: a != b,
+    "$gt": lambda a, b: a is not None and a > b,
+    "$gte": lambda a, b: a is not None and a >= b,
+    "$lt": lambda a, b: a is not None and a < b,
+    "$lte": lambda a, b: a is not None and a <= b,
+    "$in": lambda a, b: a in b,
+    "$nin": lambda a, b: a not in b,
+}
+
+def matches_where(metadata: Optional[Dict[str, Any]], where: Optional[Dict[str, Any]]) -> bool:
+    """
+    Check a metadata dict against a ChromaDB-style `where` filter.
+
+    Args:
+        metadata: The metadata to test
+        where: Filter such as {"source": "a.pdf"} or {"$and": [{"page": {"$gte": 2}}, ...]}
+
+    Returns:
+        bool: True if the metadata satisfies the filter
+    """
+    if not where:
+        return True
+    metadata = metadata or {}
+
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                if op not in _OPERATORS:
+                    raise ValueError(f"Unsupported where operator: {op}")
+                if not _OPERATORS[op](value, operand):
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+
+    return True
+
+class HashingEmbeddingFunction:
+    """
+    Embeds texts by hashing word unigrams and bigrams into a fixed-size vector.
+
+    Lexical rather than semantic, but needs nothing beyond NumPy.
+    """
+
+    def __init__(self, dim: int = 384):
+        """
+        Initialize the embedding function.
+
+        Args:
+            dim: Dimension of the produced embeddings
+        """
+        self.dim = dim
+
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        """
+        Embed a batch of texts.
+
+        Args:
+            input: The texts to embed
+
+        Returns:
+            List[np.ndarray]: One L2-normalized float32 vector per text
+        """
+        vectors = np.zeros((len(input), self.dim), dtype=np.float32)
+
+        for row, text in enumerate(input):
+            tokens = TOKEN_PATTERN.findall(text.lower())
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+                sign = 1.0 if digest & 1 else -1.0
+                vectors[row, (digest >> 1) % self.dim] += sign
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+        return list(vectors)
+
+def merge_metadata(existing: Optional[Dict[str, Any]], update: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Merge a metadata update into existing metadata the way ChromaDB's
+    `update` does: given keys are overwritten and keys set to None are removed.
+
+    Args:
+        existing: Current metadata
+        update: Metadata changes
+
+    Returns:
+        Optional[Dict[str, Any]]: The merged metadata, None if empty
+    """
+    merged = dict(existing or {})
+    for key, value in (update or {}).items():
+        if value is None:
+            merged.pop(key, None)
+        else:
+            merged[key] = value
+    return merged or None
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize the rows of a matrix.
+
+    Args:
+        vectors: 2-D array of vectors
+
+    Returns:
+        np.ndarray: Contiguous float32 array of unit-length rows
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Get the indices of the k highest scores of each row, best first.
+
+    Args:
+        scores: 2-D array of scores (queries x candidates)
+        k: Number of indices to return per row
+
+    Returns:
+        np.ndarray: 2-D array of indices
+    """
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1)
+
+class FlatIndex:
+    """
+    Brute-force cosine similarity index over a contiguous float32 matrix.
+
+    Vectors are stored normalized so similarity is a single matrix product.
+    Data is persisted as `<name>.npy` plus a `<name>.json` sidecar holding
+    ids, documents and metadata. Writes are appended to a `<name>.journal`
+    and folded into those files once the journal outgrows them, or on `flush()`.
+    """
+
+    def __init__(self,
+                 name: str,
+                 persist_directory: str,
+                 embedding_function: Optional[Callable[[List[str]], List[Any]]] = None):
+        """
+        Initialize the index, loading any persisted data.
+
+        Args:
+            name: Name of the collection
+            persist_directory: Directory to persist the index to
+            embedding_function: Callable used when texts are given without embeddings
+        """
+        self.name = name
+        self.persist_directory = persist_directory
+        self.embedding_function = embedding_function or HashingEmbeddingFunction()
+        self.vectors_path = os.path.join(persist_directory, f"{name}.npy")
+        self.sidecar_path = os.path.join(persist_directory, f"{name}.json")
+        self.journal = Journal(os.path.join(persist_directory, f"{name}.journal"))
+        self._saved_bytes = 0
+
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._size = 0
+        self._ids = []
+        self._documents = []
+        self._metadatas = []
+        self._positions = {}
+
+        self._load()
+
+    def _load(self) -> None:
+        """
+        Load the persisted matrix and sidecar if present, then replay the journal.
+        """
+        if os.path.exists(self.vectors_path) and os.path.exists(self.sidecar_path):
+            with open(self.sidecar_path, "r", encoding="utf-8") as f:
+                sidecar = json.load(f)
+
+            self._matrix = np.load(self.vectors_path)
+            self._size = len(self._matrix)
+            self._ids = sidecar["ids"]
+            self._documents = sidecar["documents"]
+            self._metadatas = sidecar["metadatas"]
+            self._positions = {item_id: row for row, item_id in enumerate(self._ids)}
+            self._saved_bytes = os.path.getsize(self.vectors_path) + os.path.getsize(self.sidecar_path)
+
+        for record in self.journal.replay():
+            if record["op"] == "upsert":
+                vectors = np.frombuffer(base64.b64decode(record["vectors"]), dtype=np.float32)
+                self._apply_upsert(
+                    record["ids"], record["documents"], record["metadatas"],
+                    vectors.reshape(len(record["ids"]), -1)
+                )
+            elif record["op"] == "delete":
+                self._apply_delete(record["ids"])
+
+    def _save(self) -> None:
+        """
+        Persist the matrix and sidecar, replacing the previous files atomically,
+        and clear the journal they now include.
+        """
+        os.makedirs(self.persist_directory, exist_ok=True)
+
+        with open(self.vectors_path + ".tmp", "wb") as f:
+            np.save(f, self._matrix[:self._size])
+        with open(self.sidecar_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({
+                "ids": self._ids,
+                "documents": self._documents,
+                "metadatas": self._metadatas
+            }, f, ensure_ascii=False)
+
+        os.replace(self.vectors_path + ".tmp", self.vectors_path)
+        os.replace(self.sidecar_path + ".tmp", self.sidecar_path)
+        self._saved_bytes = os.path.getsize(self.vectors_path) + os.path.getsize(self.sidecar_path)
+        self.journal.clear()
+
+    def _persist(self, record: Dict[str, Any]) -> None:
+        """
+        Persist a write that has been applied in memory: journal it, or save in
+        full once the journal has outgrown the last full save.
+
+        Args:
+            record: The operation, as replayed by `_load`
+        """
+        if self.journal.due(self._saved_bytes):
+            self._save()
+        else:
+            self.journal.append(record)
+
+    def _persist_rows(self, ids: List[str]) -> None:
+        """
+        Journal the current state of some items.
+
+        Args:
+            ids: IDs of the items
+        """
+        rows = [self._positions[item_id] for item_id in ids]
+        self._persist({
+            "op": "upsert",
+            "ids": ids,
+            "documents": [self._documents[row] for row in rows],
+            "metadatas": [self._metadatas[row] for row in rows],
+            "vectors": base64.b64encode(np.ascontiguousarray(self._matrix[rows]).tobytes()).decode("ascii")
+        })
+
+    def flush(self) -> None:
+        """
+        Fold the journal into the matrix and sidecar files.
+        """
+        if self.journal.size:
+            self._save()
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts with the index's embedding function.
+
+        Args:
+            texts: The texts to embed
+
+        Returns:
+            np.ndarray: Normalized embeddings
+        """
+        return _normalize(np.asarray(self.embedding_function(texts), dtype=np.float32))
+
+    def _reserve(self, rows: int, dim: int) -> None:
+        """
+        Grow the matrix geometrically so appends are amortized O(1).
+
+        Args:
+            rows: Number of rows needed
+            dim: Embedding dimension
+        """
+        if self._matrix.shape[1] not in (0, dim) and self._size:
+            raise ValueError(f"Embedding dimension {dim} does not match index dimension {self._matrix.shape[1]}")
+        if rows <= len(self._matrix) and self._matrix.shape[1] == dim:
+            return
+
+        capacity = max(rows, 2 * len(self._matrix), 1024)
+        grown = np.zeros((capacity, dim), dtype=np.float32)
+        if self._size:
+            grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+
+    def upsert(self,
+              ids: List[str],
+              documents: Optional[List[str]] = None,
+              metadatas: Optional[List[Optional[Dict[str, Any]]]] = None,
+              embeddings: Optional[List[List[float]]] = None) -> None:
+        """
+        Insert new items and overwrite existing ones with the same IDs.
+
+        Args:
+            ids: IDs of the items
+            documents: Texts of the items
+            metadatas: Optional metadata for each item
+            embeddings: Optional pre-computed embeddings, computed from documents otherwise
+        """
+        if not ids:
+            return
+        if documents is None:
+            documents = [None] * len(ids)
+        if metadatas is None:
+            metadatas = [None] * len(ids)
+
+        if embeddings is None:
+            vectors = self._embed(documents)
+        else:
+            vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+
+        self._apply_upsert(ids, documents, metadatas, vectors)
+        self._persist_rows(list(dict.fromkeys(ids)))
+
+    def _apply_upsert(self,
+                      ids: List[str],
+                      documents: List[Optional[str]],
+                      metadatas: List[Optional[Dict[str, Any]]],
+                      vectors: np.ndarray) -> None:
+        """
+        Insert or overwrite items in memory.
+
+        Args:
+            ids: IDs of the items
+            documents: Texts of the items
+            metadatas: Metadata of the items
+            vectors: Normalized embeddings of the items
+        """
+        # Deduplicate within the batch, keeping the last occurrence
+        latest = {item_id: i for i, item_id in enumerate(ids)}
+        new_ids = [item_id for item_id in latest if item_id not in self._positions]
+        self._reserve(self._size + len(new_ids), vectors.shape[1])
+
+        for item_id, i in latest.items():
+            row = self._positions.get(item_id)
+            if row is None:
+                row = self._size
+                self._size += 1
+                self._positions[item_id] = row
+                self._ids.append(item_id)
+                self._documents.append(documents[i])
+                self._metadatas.append(metadatas[i])
+            else:
+                self._documents[row] = documents[i]
+                self._metadatas[row] = metadatas[i]
+            self._matrix[row] = vectors[i]
+
+    def add(self,
+           ids: List[str],
+           documents: Optional[List[str]] = None,
+           metadatas: Optional[List[Optional[Dict[str, Any]]]] = None,
+           embeddings: Optional[List[List[float]]] = None) -> None:
+        """
+        Add items to the index. Existing IDs are overwritten.
+
+        Args:
+            ids: IDs of the items
+            documents: Texts of the items
+            metadatas: Optional metadata for each item
+            embeddings: Optional pre-computed embeddings
+        """
+        self.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+
+    def update(self,
+              ids: List[str],
+              documents: Optional[List[str]] = None,
+              metadatas: Optional[List[Optional[Dict[str, Any]]]] = None,
+              embeddings: Optional[List[List[float]]] = None) -> None:
+        """
+        Update existing items; unknown IDs are skipped. Metadata is merged into
+        the current metadata, and new documents are re-embedded unless embeddings are given.
+
+        Args:
+            ids: IDs of the items
+            documents: Optional new texts
+            metadatas: Optional metadata changes
+            embeddings: Optional new embeddings
+        """
+        known = [i for i, item_id in enumerate(ids) if item_id in self._positions]
+        if not known:
+            return
+
+        vectors = None
+        if embeddings is not None:
+            vectors = _normalize(np.asarray([embeddings[i] for i in known], dtype=np.float32))
+        elif documents is not None:
+            vectors = self._embed([documents[i] for i in known])
+
+        for j, i in enumerate(known):
+            row = self._positions[ids[i]]
+            if documents is not None:
+                self._documents[row] = documents[i]
+            if metadatas is not None:
+                self._metadatas[row] = merge_metadata(self._metadatas[row], metadatas[i])
+            if vectors is not None:
+                self._matrix[row] = vectors[j]
+
+        self._persist_rows(list(dict.fromkeys(ids[i] for i in known)))
+
+    def _allowed_rows(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """
+        Compute a boolean mask of rows matching a `where` filter.
+
+        Args:
+            where: Optional filter
+
+        Returns:
+            Optional[np.ndarray]: The mask, or None when there is no filter
+        """
+        if not where:
+            return None
+        return np.fromiter(
+            (matches_where(metadata, where) for metadata in self._metadatas),
+            dtype=bool,
+            count=self._size
+        )
+
+    def query(self,
+             query_texts: Optional[List[str]] = None,
+             query_embeddings: Optional[List[List[float]]] = None,
+             n_results: int = 10,
+             where: Optional[Dict[str, Any]] = None,
+             include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Find the nearest items for one or more queries.
+
+        Args:
+            query_texts: Query texts, embedded with the index's embedding function
+            query_embeddings: Pre-computed query embeddings
+            n_results: Number of results per query
+            where: Optional metadata filter
+            include: Accepted for API compatibility; documents, metadatas and distances are always returned
+
+        Returns:
+            Dict[str, Any]: ChromaDB-style results with one inner list per query;
+                distances are cosine distances (1 - cosine similarity)
+        """
+        if query_embeddings is not None:
+            queries = _normalize(np.asarray(query_embeddings, dtype=np.float32))
+        else:
+            queries = self._embed(query_texts or [])
+
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if not len(queries):
+            return results
+
+        allowed = self._allowed_rows(where)
+        available = self._size if allowed is None else int(allowed.sum())
+        k = min(n_results, available)
+
+        if k == 0:
+            for key in results:
+                results[key] = [[] for _ in range(len(queries))]
+            return results
+
+        scores = queries @ self._matrix[:self._size].T
+        if allowed is not None:
+            scores[:, ~allowed] = -np.inf
+
+        top = _top_k(scores, k)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+
+        for rows, row_scores in zip(top, top_scores):
+            results["ids"].append([self._ids[row] for row in rows])
+            results["documents"].append([self._documents[row] for row in rows])
+            results["metadatas"].append([self._metadatas[row] for row in rows])
+            results["distances"].append((1.0 - row_scores).tolist())
+
+        return results
+
+    def get(self,
+           ids: Optional[List[str]] = None,
+           where: Optional[Dict[str, Any]] = None,
+           include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Get items by ID and/or metadata filter.
+
+        Args:
+            ids: Optional IDs to fetch; missing IDs are skipped
+            where: Optional metadata filter
+            include: Add 'embeddings' to also return the stored (normalized) vectors
+
+        Returns:
+            Dict[str, Any]: Results with 'ids', 'documents' and 'metadatas'
+        """
+        if ids is None:
+            rows = range(self._size)
+        else:
+            rows = [self._positions[item_id] for item_id in ids if item_id in self._positions]
+        rows = [row for row in rows if matches_where(self._metadatas[row], where)]
+
+        results = {
+            "ids": [self._ids[row] for row in rows],
+            "documents": [self._documents[row] for row in rows],
+            "metadatas": [self._metadatas[row] for row in rows]
+        }
+        if include and "embeddings" in include:
+            results["embeddings"] = self._matrix[rows]
+        return results
+
+    def delete(self, ids: List[str]) -> None:
+        """
+        Delete items by ID, compacting the matrix in place.
+
+        Args:
+            ids: IDs of the items to delete
+        """
+        doomed = [item_id for item_id in ids if item_id in self._positions]
+        if not doomed:
+            return
+
+        self._apply_delete(doomed)
+        self._persist({"op": "delete", "ids": doomed})
+
+    def _apply_delete(self, ids: List[str]) -> None:
+        """
+        Delete items in memory, compacting the matrix in place.
+
+        Args:
+            ids: IDs of the items to delete
+        """
+        doomed = {self._positions[item_id] for item_id in ids if item_id in self._positions}
+        if not doomed:
+            return
+
+        keep = np.ones(self._size, dtype=bool)
+        keep[list(doomed)] = False
+        kept_rows = np.flatnonzero(keep)
+
+        self._matrix[:len(kept_rows)] = self._matrix[kept_rows]
+        self._size = len(kept_rows)
+        self._ids = [self._ids[row] for row in kept_rows]
+        self._documents = [self._documents[row] for row in kept_rows]
+        self._metadatas = [self._metadatas[row] for row in kept_rows]
+        self._positions = {item_id: row for row, item_id in enumerate(self._ids)}
+
+    def count(self) -> int:
+        """
+        Get the number of items in the index.
+
+        Returns:
+            int: Number of items
+        """
+        return self._size
+
+class MmapIndex:
+    """
+    On-disk index for collections larger than RAM.
+
+    Embeddings are appended to a raw `<name>.vec` file and memory-mapped on
+    open, so startup cost does not depend on the size of the index. IDs,
+    documents and metadata live in a SQLite side index (`<name>.sqlite`)
+    that is queried on demand rather than loaded. Deletes and overwrites
+    leave tombstoned rows behind until `compact()`. Searches scan the map in
+    blocks so resident memory stays bounded.
+
+    With quantization enabled, compact codes (`<name>.codes`) are scanned
+    instead of the full vectors, and only the best `n_results * rerank_factor`
+    candidates are re-ranked with exact distances from the vector file. The
+    quantizer is trained once the index holds `QUANTIZER_MIN_TRAINING_ROWS`
+    rows (full vectors are scanned until then) and retrained on the live rows
+    by every `compact()`, so it follows the data as it grows.
+    """
+
+    def __init__(self,
+                 name: str,
+                 persist_directory: str,
+                 embedding_function: Optional[Callable[[List[str]], List[Any]]] = None,
+                 dtype: str = "float32",
+                 block_size: int = 65536,
+                 quantization: Optional[str] = None,
+                 rerank_factor: Optional[int] = None,
+                 pq_subvectors: Optional[int] = None):
+        """
+        Initialize the index, mapping any persisted data.
+
+        Args:
+            name: Name of the collection
+            persist_directory: Directory to persist the index to
+            embedding_function: Callable used when texts are given without embeddings
+            dtype: Storage type of new embeddings, 'float32' or 'float16'; an existing
+                index keeps the type it was created with
+            block_size: Number of rows scored at a time during a search
+            quantization: None, 'int8' (4x smaller scan) or 'pq' (product quantization,
+                16x smaller scan by default); an existing index keeps its setting
+            rerank_factor: Candidates re-ranked exactly per requested result; higher
+                values trade latency for recall. Defaults to the quantizer's
+                `default_rerank_factor`: 4 for int8 and 32 for PQ, whose
+                approximate scores need a deeper re-rank to keep recall@10 near 0.98
+            pq_subvectors: Number of PQ subvectors, defaults to a quarter of the dimension
+        """
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported storage dtype: {dtype}")
+        if quantization is not None and quantization not in QUANTIZERS:
+            raise ValueError(f"Unsupported quantization: {quantization}")
+
+        self.name = name
+        self.persist_directory = persist_directory
+        self.embedding_function = embedding_function or HashingEmbeddingFunction()
+        self.block_size = max(1, block_size)
+        self.vectors_path = os.path.join(persist_directory, f"{name}.vec")
+        self.index_path = os.path.join(persist_directory, f"{name}.sqlite")
+        self.codes_path = os.path.join(persist_directory, f"{name}.codes")
+        self.quantizer_path = os.path.join(persist_directory, f"{name}.quantizer.npz")
+
+        os.makedirs(persist_directory, exist_ok=True)
+        self._db = sqlite3.connect(self.index_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            "row INTEGER PRIMARY KEY, id TEXT, document TEXT, metadata TEXT, live INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS items_id ON items (id) WHERE live = 1")
+        self._db.execute("CREATE TABLE IF NOT EXISTS header (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.commit()
+
+        header = dict(self._db.execute("SELECT key, value FROM header"))
+        self.dim = int(header["dim"]) if "dim" in header else None
+        self.dtype = np.dtype(header.get("dtype", dtype))
+
+        # Indexes that already hold vectors keep the quantization they were created with
+        self.quantization = (header.get("quantization", "") if self.dim else quantization) or None
+        self.quantizer = None
+        # The saved quantizer state marks the codes file as complete and usable
+        self.quantizer_trained = bool(self.quantization) and os.path.exists(self.quantizer_path)
+        if self.quantizer_trained:
+            with np.load(self.quantizer_path) as state:
+                self.quantizer = QUANTIZERS[self.quantization].from_state(dict(state))
+        elif self.quantization == ProductQuantizer.kind:
+            self.quantizer = ProductQuantizer(n_subvectors=pq_subvectors)
+        elif self.quantization:
+            self.quantizer = QUANTIZERS[self.quantization]()
+        if rerank_factor is None:
+            rerank_factor = self.quantizer.default_rerank_factor if self.quantizer is not None else 1
+        self.rerank_factor = max(1, rerank_factor)
+
+        self._map = None
+        self._codes = None
+        self._rows = 0
+        self._live = None
+        self._remap()
+
+    def _remap(self) -> None:
+        """
+        Re-create the memory map after the vector file has changed.
+        """
+        self._live = None
+        self._codes = None
+        if self.dim is None or not os.path.exists(self.vectors_path):
+            self._map = None
+            self._rows = 0
+            return
+
+        rows = os.path.getsize(self.vectors_path) // (self.dim * self.dtype.itemsize)
+        # Ignore vectors whose side index entry was never committed (e.g. after a crash)
+        indexed = self._db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM items").fetchone()[0]
+        self._rows = min(rows, indexed)
+        self._map = np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(rows, self.dim)) if rows else None
+
+        if self.quantizer_trained and os.path.exists(self.codes_path):
+            code_size = self.quantizer.code_size(self.dim)
+            code_rows = os.path.getsize(self.codes_path) // (code_size * self.quantizer.code_dtype.itemsize)
+            self._rows = min(self._rows, code_rows)
+            if code_rows:
+                self._codes = np.memmap(
+                    self.codes_path, dtype=self.quantizer.code_dtype, mode="r", shape=(code_rows, code_size)
+                )
+
+    def _live_rows(self) -> np.ndarray:
+        """
+        Get a boolean mask of the mapped rows that are not tombstoned.
+
+        Returns:
+            np.ndarray: The mask, cached until the next write
+        """
+        if self._live is None:
+            self._live = np.ones(self._rows, dtype=bool)
+            dead = [row for (row,) in self._db.execute("SELECT row FROM items WHERE live = 0 AND row < ?", (self._rows,))]
+            self._live[dead] = False
+        return self._live
+
+    def _fetch(self, rows: List[int]) -> Dict[int, Tuple[str, Optional[str], Optional[Dict[str, Any]]]]:
+        """
+        Load the id, document and metadata of specific rows.
+
+        Args:
+            rows: Row numbers to load
+
+        Returns:
+            Dict[int, Tuple]: (id, document, metadata) per row
+        """
+        found = {}
+        for start in range(0, len(rows), 500):
+            chunk = [int(row) for row in rows[start:start + 500]]
+            placeholders = ",".join("?" * len(chunk))
+            for row, item_id, document, metadata in self._db.execute(
+                f"SELECT row, id, document, metadata FROM items WHERE row IN ({placeholders})", chunk
+            ):
+                found[row] = (item_id, document, json.loads(metadata) if metadata else None)
+        return found
+
+    def upsert(self,
+              ids: List[str],
+              documents: Optional[List[str]] = None,
+              metadatas: Optional[List[Optional[Dict[str, Any]]]] = None,
+              embeddings: Optional[List[List[float]]] = None) -> None:
+        """
+        Append items, tombstoning any previous rows with the same IDs.
+
+        Args:
+            ids: IDs of the items
+            documents: Texts of the items
+            metadatas: Optional metadata for each item
+            embeddings: Optional pre-computed embeddings, computed from documents otherwise
+        """
+        if not ids:
+            return
+        if documents is None:
+            documents = [None] * len(ids)
+        if metadatas is None:
+            metadatas = [None] * len(ids)
+
+        if embeddings is None:
+            vectors = _normalize(np.asarray(self.embedding_function(documents), dtype=np.float32))
+        else:
+            vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._db.executemany(
+                "INSERT OR REPLACE INTO header (key, value) VALUES (?, ?)",
+                [("dim", str(self.dim)), ("dtype", self.dtype.name), ("quantization", self.quantization or "")]
+            )
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}")
+
+        # Drop rows left by an interrupted write so new rows line up with the side index
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(self._rows * self.dim * self.dtype.itemsize)
+            f.write(vectors.astype(self.dtype).tobytes())
+        if self.quantizer_trained:
+            codes = self.quantizer.encode(vectors)
+            with open(self.codes_path, "ab") as f:
+                f.truncate(self._rows * codes.shape[1] * codes.itemsize)
+                f.write(codes.tobytes())
+
+        # Vectors are written before the side index commits, so every committed row has a vector
+        with self._db:
+            self._tombstone(ids)
+            self._db.executemany(
+                "INSERT INTO items (row, id, document, metadata, live) VALUES (?, ?, ?, ?, 1)",
+                [
+                    (self._rows + i, item_id, document, json.dumps(metadata, ensure_ascii=False) if metadata else None)
+                    for i, (item_id, document, metadata) in enumerate(zip(ids, documents, metadatas))
+                ]
+            )
+            # Only the last occurrence of an ID repeated within the batch stays live
+            latest = {item_id: i for i, item_id in enumerate(ids)}
+            if len(latest) != len(ids):
+                self._db.executemany(
+                    "UPDATE items SET live = 0 WHERE row = ?",
+                    [(self._rows + i,) for i, item_id in enumerate(ids) if latest[item_id] != i]
+                )
+
+        self._remap()
+        if self.quantizer is not None and not self.quantizer_trained and self._rows >= QUANTIZER_MIN_TRAINING_ROWS:
+            self._train_quantizer()
+
+    def _train_quantizer(self) -> None:
+        """
+        Train the quantizer on a sample of the live rows and re-encode every row.
+
+        The codes file is replaced before the quantizer state is saved, so an
+        interrupted run leaves the index untrained rather than inconsistent.
+        """
+        if os.path.exists(self.quantizer_path):
+            os.remove(self.quantizer_path)
+        self.quantizer_trained = False
+
+        live_rows = np.flatnonzero(self._live_rows())
+        if len(live_rows) > QUANTIZER_TRAINING_SAMPLE:
+            rng = np.random.default_rng(0)
+            live_rows = np.sort(rng.choice(live_rows, QUANTIZER_TRAINING_SAMPLE, replace=False))
+        self.quantizer.train(np.asarray(self._map[live_rows], dtype=np.float32))
+
+        self._codes = None
+        with open(self.codes_path + ".tmp", "wb") as f:
+            for start in range(0, self._rows, self.block_size):
+                block = np.asarray(self._map[start:min(start + self.block_size, self._rows)], dtype=np.float32)
+                f.write(self.quantizer.encode(block).tobytes())
+        os.replace(self.codes_path + ".tmp", self.codes_path)
+
+        with open(self.quantizer_path + ".tmp", "wb") as f:
+            np.savez(f, **self.quantizer.state())
+        os.replace(self.quantizer_path + ".tmp", self.quantizer_path)
+        self.quantizer_trained = True
+        self._remap()
+
+    def add(self,
+           ids: List[str],
+           documents: Optional[List[str]] = None,
+           metadatas: Optional[List[Optional[Dict[str, Any]]]] = None,
+           embeddings: Optional[List[List[float]]] = None) -> None:
+        """
+        Add items to the index. Existing IDs are overwritten.
+
+        Args:
+            ids: IDs of the items
+            documents: Texts of the items
+            metadatas: Optional metadata for each item
+            embeddings: Optional pre-computed embeddings
+        """
+        self.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+
+    def update(self,
+              ids: List[str],
+              documents: Optional[List[str]] = None,
+              metadatas: Optional[List[Optional[Dict[str, Any]]]] = None,
+              embeddings: Optional[List[List[float]]] = None) -> None:
+        """
+        Update existing items; unknown IDs are skipped. Metadata is merged into
+        the current metadata. Metadata-only updates are rewritten in the side
+        index; new documents or embeddings append fresh rows.
+
+        Args:
+            ids: IDs of the items
+            documents: Optional new texts
+            metadatas: Optional metadata changes
+            embeddings: Optional new embeddings
+        """
+        current = self.get(ids=ids)
+        existing = {
+            item_id: (document, metadata)
+            for item_id, document, metadata in zip(current["ids"], current["documents"], current["metadatas"])
+        }
+        known = [i for i, item_id in enumerate(ids) if item_id in existing]
+        if not known:
+            return
+
+        merged = [
+            merge_metadata(existing[ids[i]][1], metadatas[i]) if metadatas is not None else existing[ids[i]][1]
+            for i in known
+        ]
+
+        if documents is None and embeddings is None:
+            with self._db:
+                self._db.executemany(
+                    "UPDATE items SET metadata = ? WHERE id = ? AND live = 1",
+                    [
+                        (json.dumps(metadata, ensure_ascii=False) if metadata else None, ids[i])
+                        for i, metadata in zip(known, merged)
+                    ]
+                )
+            return
+
+        self.upsert(
+            ids=[ids[i] for i in known],
+            documents=[documents[i] if documents is not None else existing[ids[i]][0] for i in known],
+            metadatas=merged,
+            embeddings=[embeddings[i] for i in known] if embeddings is not None else None
+        )
+
+    def _tombstone(self, ids: List[str]) -> None:
+        """
+        Mark the live rows of the given IDs as deleted, inside the caller's transaction.
+
+        Args:
+            ids: IDs to tombstone
+        """
+        self._db.executemany("UPDATE items SET live = 0 WHERE id = ? AND live = 1", [(item_id,) for item_id in ids])
+
+    def query(self,
+             query_texts: Optional[List[str]] = None,
+             query_embeddings: Optional[List[List[float]]] = None,
+             n_results: int = 10,
+             where: Optional[Dict[str, Any]] = None,
+             include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Find the nearest items for one or more queries by scanning the map in blocks.
+
+        Args:
+            query_texts: Query texts, embedded with the index's embedding function
+            query_embeddings: Pre-computed query embeddings
+            n_results: Number of results per query
+            where: Optional metadata filter
+            include: Accepted for API compatibility
+
+        Returns:
+            Dict[str, Any]: ChromaDB-style results with one inner list per query;
+                distances are cosine distances (1 - cosine similarity)
+        """
+        if query_embeddings is not None:
+            queries = _normalize(np.asarray(query_embeddings, dtype=np.float32))
+        else:
+            queries = _normalize(np.asarray(self.embedding_function(query_texts or []), dtype=np.float32))
+
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if not len(queries):
+            return results
+
+        if self._codes is None:
+            best_rows, best_scores = self._scan(queries, n_results, where, self._exact_scores)
+        else:
+            best_rows, best_scores = self._scan(
+                queries, n_results * self.rerank_factor, where, self._approximate_scores
+            )
+            best_rows, best_scores = self._rerank(queries, best_rows, best_scores, n_results)
+
+        found = self._fetch(np.unique(best_rows).tolist())
+        for rows, row_scores in zip(best_rows, best_scores):
+            finite = np.isfinite(row_scores)
+            rows, row_scores = rows[finite], row_scores[finite]
+            results["ids"].append([found[row][0] for row in rows])
+            results["documents"].append([found[row][1] for row in rows])
+            results["metadatas"].append([found[row][2] for row in rows])
+            results["distances"].append((1.0 - row_scores).tolist())
+
+        return results
+
+    def _exact_scores(self, queries: np.ndarray, start: int, end: int) -> np.ndarray:
+        """
+        Score a block of rows against the full-precision vectors.
+
+        Args:
+            queries: Normalized queries
+            start: First row of the block
+            end: End of the block (exclusive)
+
+        Returns:
+            np.ndarray: Cosine similarities (queries x rows)
+        """
+        return queries @ np.asarray(self._map[start:end], dtype=np.float32).T
+
+    def _approximate_scores(self, queries: np.ndarray, start: int, end: int) -> np.ndarray:
+        """
+        Score a block of rows against their quantized codes.
+
+        Args:
+            queries: Normalized queries
+            start: First row of the block
+            end: End of the block (exclusive)
+
+        Returns:
+            np.ndarray: Approximate cosine similarities (queries x rows)
+        """
+        return self.quantizer.scores(queries, np.asarray(self._codes[start:end]))
+
+    def _scan(self,
+             queries: np.ndarray,
+             k: int,
+             where: Optional[Dict[str, Any]],
+             scorer: Callable[[np.ndarray, int, int], np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scan all rows block by block, keeping a running top-k per query.
+
+        Args:
+            queries: Normalized queries
+            k: Number of rows to keep per query
+            where: Optional metadata filter
+            scorer: Function scoring the queries against a block of rows
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Best rows and their scores per query, best first;
+                unfilled slots have a score of -inf
+        """
+        live_rows = self._live_rows()
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+
+        for start in range(0, self._rows, self.block_size):
+            end = min(start + self.block_size, self._rows)
+            live = live_rows[start:end]
+            if where:
+                live = live.copy()
+                for row, metadata in self._db.execute(
+                    "SELECT row, metadata FROM items WHERE live = 1 AND row >= ? AND row < ?", (start, end)
+                ):
+                    if not matches_where(json.loads(metadata) if metadata else None, where):
+                        live[row - start] = False
+            if not live.any():
+                continue
+
+            scores = scorer(queries, start, end)
+            scores[:, ~live] = -np.inf
+            top = _top_k(scores, min(k, int(live.sum())))
+
+            # Merge this block's best rows into the running top-k
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, top, axis=1)], axis=1)
+            best_rows = np.concatenate([best_rows, top + start], axis=1)
+            keep = _top_k(best_scores, min(k, best_scores.shape[1]))
+            best_scores = np.take_along_axis(best_scores, keep, axis=1)
+            best_rows = np.take_along_axis(best_rows, keep, axis=1)
+
+        return best_rows, best_scores
+
+    def _rerank(self,
+               queries: np.ndarray,
+               rows: np.ndarray,
+               scores: np.ndarray,
+               k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Re-rank approximate candidates with exact similarities.
+
+        Args:
+            queries: Normalized queries
+            rows: Candidate rows per query
+            scores: Approximate scores of the candidates (-inf for unfilled slots)
+            k: Number of results to keep per query
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Best rows and exact scores per query, best first
+        """
+        if not rows.size:
+            return rows, scores
+
+        # Read each candidate vector once, in file order
+        unique_rows, inverse = np.unique(rows, return_inverse=True)
+        vectors = np.asarray(self._map[unique_rows], dtype=np.float32)
+        exact = np.einsum("qcd,qd->qc", vectors[inverse.reshape(rows.shape)], queries)
+        exact[~np.isfinite(scores)] = -np.inf
+
+        keep = _top_k(exact, min(k, exact.shape[1]))
+        return np.take_along_axis(rows, keep, axis=1), np.take_along_axis(exact, keep, axis=1)
+
+    def get(self,
+           ids: Optional[List[str]] = None,
+           where: Optional[Dict[str, Any]] = None,
+           include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Get items by ID and/or metadata filter.
+
+        Args:
+            ids: Optional IDs to fetch; missing IDs are skipped
+            where: Optional metadata filter
+            include: Add 'embeddings' to also return the stored (normalized) vectors
+
+        Returns:
+            Dict[str, Any]: Results with 'ids', 'documents' and 'metadatas'
+        """
+        if ids is None:
+            rows = [row for (row,) in self._db.execute("SELECT row FROM items WHERE live = 1 ORDER BY row")]
+        else:
+            rows = []
+            for start in range(0, len(ids), 500):
+                chunk = list(ids[start:start + 500])
+                placeholders = ",".join("?" * len(chunk))
+                by_id = dict(self._db.execute(
+                    f"SELECT id, row FROM items WHERE live = 1 AND id IN ({placeholders})", chunk
+                ))
+                rows.extend(by_id[item_id] for item_id in chunk if item_id in by_id)
+
+        found = self._fetch(rows)
+        rows = [row for row in rows if matches_where(found[row][2], where)]
+
+        results = {
+            "ids": [found[row][0] for row in rows],
+            "documents": [found[row][1] for row in rows],
+            "metadatas": [found[row][2] for row in rows]
+        }
+        if include and "embeddings" in include:
+            results["embeddings"] = np.asarray(self._map[rows], dtype=np.float32)
+        return results
+
+    def delete(self, ids: List[str]) -> None:
+        """
+        Tombstone items by ID. Space is reclaimed by `compact()`.
+
+        Args:
+            ids: IDs of the items to delete
+        """
+        with self._db:
+            self._tombstone(ids)
+        self._live = None
+
+    def count(self) -> int:
+        """
+        Get the number of live items in the index.
+
+        Returns:
+            int: Number of items
+        """
+        return self._db.execute("SELECT COUNT(*) FROM items WHERE live = 1").fetchone()[0]
+
+    def compact(self) -> None:
+        """
+        Rewrite the vector file and side index without tombstoned rows, and
+        retrain a quantized index's codes on the remaining rows.
+        """
+        if self._map is None:
+            return
+
+        live_rows = np.flatnonzero(self._live_rows())
+
+        with open(self.vectors_path + ".tmp", "wb") as f:
+            for start in range(0, len(live_rows), self.block_size):
+                f.write(np.asarray(self._map[live_rows[start:start + self.block_size]]).tobytes())
+
+        # Codes are rebuilt below; until then the index is untrained and scans full vectors
+        if self.quantizer_trained:
+            os.remove(self.quantizer_path)
+            self.quantizer_trained = False
+
+        with self._db:
+            self._db.execute("DELETE FROM items WHERE live = 0 OR row >= ?", (self._rows,))
+            # Rows only move down and are renumbered in order, so no update collides
+            self._db.executemany(
+                "UPDATE items SET row = ? WHERE row = ?",
+                [(new_row, int(old_row)) for new_row, old_row in enumerate(live_rows) if new_row != old_row]
+            )
+            self._map = None
+            self._codes = None
+            os.replace(self.vectors_path + ".tmp", self.vectors_path)
+
+        self._remap()
+        if self.quantizer is not None and self._rows >= QUANTIZER_MIN_TRAINING_ROWS:
+            self._train_quantizer()
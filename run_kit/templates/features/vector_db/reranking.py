@@ -0,0 +1,89 @@
+"""
+Post-processing of search candidates: distance thresholds, maximal marginal
+relevance (MMR) and per-metadata-field diversity caps.
+"""
+
+import numpy as np
+from typing import List, Dict, Any, Optional
+
+def within_distance(distances: List[Optional[float]], max_distance: float) -> np.ndarray:
+    """
+    Compute which candidates are within a distance threshold.
+
+    Args:
+        distances: Candidate distances; None (keyword-only hybrid hits) is always kept
+        max_distance: Largest distance to keep
+
+    Returns:
+        np.ndarray: Boolean mask of candidates to keep
+    """
+    values = np.array([np.nan if d is None else d for d in distances], dtype=np.float64)
+    return np.isnan(values) | (values <= max_distance)
+
+def maximal_marginal_relevance(query_embedding: Any,
+                               embeddings: Any,
+                               lambda_mult: float = 0.5,
+                               k: Optional[int] = None) -> List[int]:
+    """
+    Order candidates by maximal marginal relevance, trading relevance to the
+    query against similarity to the candidates already selected.
+
+    Args:
+        query_embedding: The query embedding
+        embeddings: Candidate embeddings (n x dim)
+        lambda_mult: 1.0 ranks by relevance only, 0.0 by diversity only
+        k: Number of candidates to select, all by default
+
+    Returns:
+        List[int]: Indices of the selected candidates, in selection order
+    """
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    if not len(vectors):
+        return []
+
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = vectors @ query
+    similarity = vectors @ vectors.T
+    k = len(vectors) if k is None else min(k, len(vectors))
+
+    selected = [int(np.argmax(relevance))]
+    remaining = np.ones(len(vectors), dtype=bool)
+    remaining[selected[0]] = False
+    # Highest similarity of each candidate to anything selected so far
+    redundancy = similarity[selected[0]].copy()
+
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        scores[~remaining] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        remaining[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+
+    return selected
+
+def cap_per_value(metadatas: List[Optional[Dict[str, Any]]], field: str, max_per_value: int) -> List[int]:
+    """
+    Keep candidates in order while allowing at most `max_per_value` per value of a metadata field.
+
+    Args:
+        metadatas: Candidate metadata, in rank order
+        field: Metadata field to diversify on, e.g. 'source'; candidates without it are uncapped
+        max_per_value: Maximum number of candidates sharing one value
+
+    Returns:
+        List[int]: Indices of the kept candidates
+    """
+    counts = {}
+    kept = []
+    for i, metadata in enumerate(metadatas):
+        value = (metadata or {}).get(field)
+        if value is not None:
+            if counts.get(value, 0) >= max_per_value:
+                continue
+            counts[value] = counts.get(value, 0) + 1
+        kept.append(i)
+    return kept
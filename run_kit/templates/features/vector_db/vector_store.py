@@ -1,72 +1,303 @@
 """
 Vector database integration using ChromaDB for semantic search capabilities.
+
+Falls back to a built-in NumPy index when ChromaDB is not installed.
 """
 
 import os
 import json
+import asyncio
 import hashlib
+import itertools
+import threading
+import importlib.util
 import numpy as np
-from typing import List, Dict, Any, Optional, Union, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Union, Tuple, Iterable, Iterator, Callable
+
+# Check if ChromaDB is installed without importing it; it is imported on first use
+HAS_CHROMADB = importlib.util.find_spec("chromadb") is not None
+
+from app.db.local_index import FlatIndex, MmapIndex, HashingEmbeddingFunction
+from app.db.embedding_cache import EmbeddingCache, CachedEmbeddingFunction
+from app.db.bm25 import BM25Index, reciprocal_rank_fusion
+from app.db.dedup import SimHashIndex, simhash
+from app.db.reranking import within_distance, maximal_marginal_relevance, cap_per_value
+from app.db.locking import ReadWriteLock
+
+# Storage backends
+BACKEND_AUTO = "auto"
+BACKEND_CHROMA = "chroma"
+BACKEND_FLAT = "flat"
+BACKEND_MMAP = "mmap"
+
+# Default number of texts written per backend call during bulk ingestion
+DEFAULT_BATCH_SIZE = 256
+
+# Candidates fetched from each ranking per requested result in hybrid search
+HYBRID_CANDIDATE_FACTOR = 4
+
+# Candidates fetched per requested result when search results are post-processed
+RERANK_CANDIDATE_FACTOR = 4
 
-# Check if ChromaDB is installed
-try:
+# Metadata key holding the SHA-256 of a document's text, used by upsert_texts
+CONTENT_HASH_KEY = "content_hash"
+
+# ChromaDB clients shared by every VectorDatabase using the same directory
+_clients = {}
+_clients_lock = threading.Lock()
+
+def _shared_client(path: str) -> Any:
+    """
+    Get the process-wide ChromaDB client for a directory, creating it on first use.
+    
+    Args:
+        path: The persist directory
+        
+    Returns:
+        Any: The shared PersistentClient
+    """
     import chromadb
     from chromadb.config import Settings
-    HAS_CHROMADB = True
-except ImportError:
-    HAS_CHROMADB = False
+    
+    key = os.path.realpath(path)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = chromadb.PersistentClient(
+                path=path,
+                settings=Settings(anonymized_telemetry=False)
+            )
+        return _clients[key]
+
+def _batched(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """
+    Split an iterable into lists of at most `size` items without materializing it.
+    
+    Args:
+        iterable: The items to split
+        size: Maximum batch size
+        
+    Returns:
+        Iterator[List[Any]]: Successive batches
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def _normalize_item(item: Union[str, Tuple[str, Dict[str, Any]], Dict[str, Any]]) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Convert an ingestion item into a (text, metadata, id) tuple.
+    
+    Args:
+        item: A text, a (text, metadata) tuple or a dict with 'text', 'metadata' and 'id'
+        
+    Returns:
+        Tuple[str, Optional[Dict[str, Any]], Optional[str]]: The normalized item,
+            with empty metadata as None since ChromaDB rejects empty dicts
+    """
+    if isinstance(item, str):
+        return item, None, None
+    if isinstance(item, dict):
+        return item["text"], item.get("metadata") or None, item.get("id")
+    text, metadata = item
+    return text, metadata or None, None
 
 class VectorDatabase:
     """
     A vector database for storing and retrieving document embeddings.
+    
+    Construction is cheap: the backend is opened on first use. Searches run
+    concurrently under a shared lock while writes are exclusive, and every
+    public method has an `a`-prefixed coroutine version for asyncio code.
     """
     
-    def __init__(self, collection_name: str = "documents", persist_directory: str = None):
+    def __init__(self, 
+                 collection_name: str = "documents", 
+                 persist_directory: str = None,
+                 embedding_function: Optional[Callable[[List[str]], List[List[float]]]] = None,
+                 backend: str = BACKEND_AUTO,
+                 storage_dtype: str = "float32",
+                 embedding_cache: bool = True,
+                 hybrid: bool = False,
+                 quantization: Optional[str] = None,
+                 rerank_factor: Optional[int] = None,
+                 pq_subvectors: Optional[int] = None,
+                 model_id: Optional[str] = None):
         """
         Initialize the vector database.
         
         Args:
             collection_name: Name of the collection to store documents in
             persist_directory: Directory to persist the database to
+            embedding_function: Optional callable mapping a list of texts to embeddings,
+                defaults to ChromaDB's default embedding function
+            backend: 'chroma', 'flat' (built-in NumPy index), 'mmap' (memory-mapped
+                on-disk index for collections larger than RAM) or 'auto' to use
+                ChromaDB when it is installed and the flat index otherwise
+            storage_dtype: Embedding storage type for the mmap backend, 'float32' or 'float16'
+            embedding_cache: Whether to cache embeddings on disk by model and text hash
+            hybrid: Whether to maintain a BM25 keyword index alongside the vectors and
+                fuse keyword and vector rankings in search by default
+            quantization: Compressed scan mode for the mmap backend: None, 'int8' or 'pq';
+                other backends raise ValueError when it is set
+            rerank_factor: Quantized candidates re-ranked exactly per result; raise it
+                to trade latency for recall. Defaults to 4 for 'int8' and 32 for 'pq'
+            pq_subvectors: Number of subvectors for 'pq', defaults to a quarter of the dimension
+            model_id: Embedding cache namespace, derived from the embedding function if not
+                given; set it when one function can serve several models
         """
+        if quantization is not None and backend != BACKEND_MMAP:
+            raise ValueError(f"Quantization requires the '{BACKEND_MMAP}' backend, not '{backend}'")
+        
         self.collection_name = collection_name
         self.persist_directory = persist_directory or os.path.join("app", "data", "chromadb")
+        self.embedding_function = embedding_function
+        self.backend = backend
+        self.storage_dtype = storage_dtype
+        self.use_embedding_cache = embedding_cache
+        self._embed = None
+        self.hybrid = hybrid
+        self.quantization = quantization
+        self.rerank_factor = rerank_factor
+        self.pq_subvectors = pq_subvectors
+        self.model_id = model_id
+        self.keyword_index = None
+        self.dedup_index = None
         self.client = None
         self.collection = None
-        
-        # Create the persist directory if it doesn't exist
-        os.makedirs(self.persist_directory, exist_ok=True)
-        
-        # Initialize the database
-        self._initialize()
+        # Metric of the collection's distances; the built-in indexes always use cosine distance
+        self.distance_space = "cosine"
+        self.lock = ReadWriteLock()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+    
+    def _ensure_initialized(self) -> None:
+        """
+        Open the backend on first use, once, even under concurrent first calls.
+        """
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            # Create the persist directory if it doesn't exist
+            os.makedirs(self.persist_directory, exist_ok=True)
+            self._initialize()
+            self._initialized = True
     
     def _initialize(self) -> None:
         """
         Initialize the database connection.
         """
-        if not HAS_CHROMADB:
+        if self.backend == BACKEND_AUTO:
+            self.backend = BACKEND_CHROMA if HAS_CHROMADB else BACKEND_FLAT
+        
+        if self.backend == BACKEND_CHROMA and not HAS_CHROMADB:
             print("ChromaDB is not installed. Install with: pip install chromadb")
             return
         
-        try:
-            self.client = chromadb.PersistentClient(
-                path=self.persist_directory,
-                settings=Settings(anonymized_telemetry=False)
+        if self.embedding_function is None:
+            if self.backend == BACKEND_CHROMA:
+                from chromadb.utils import embedding_functions
+                self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+            else:
+                self.embedding_function = HashingEmbeddingFunction()
+        
+        # Embeddings are computed here rather than by the backend so they can be cached
+        self._embed = self.embedding_function
+        if self.use_embedding_cache:
+            self._embed = CachedEmbeddingFunction(
+                self.embedding_function,
+                EmbeddingCache(os.path.join(self.persist_directory, "embedding_cache.sqlite")),
+                model_id=self.model_id
+            )
+        
+        if self.backend == BACKEND_MMAP:
+            self.collection = MmapIndex(
+                self.collection_name,
+                self.persist_directory,
+                embedding_function=self.embedding_function,
+                dtype=self.storage_dtype,
+                quantization=self.quantization,
+                rerank_factor=self.rerank_factor,
+                pq_subvectors=self.pq_subvectors
+            )
+        elif self.backend == BACKEND_FLAT:
+            self.collection = FlatIndex(
+                self.collection_name,
+                self.persist_directory,
+                embedding_function=self.embedding_function
             )
+        else:
+            self._initialize_chroma()
+        
+        if self.hybrid and self.collection is not None:
+            self._initialize_keyword_index()
+    
+    def _initialize_chroma(self) -> None:
+        """
+        Open the ChromaDB client and collection.
+        """
+        try:
+            self.client = _shared_client(self.persist_directory)
             
-            # Get or create the collection
-            try:
-                self.collection = self.client.get_collection(self.collection_name)
-                print(f"Loaded existing collection: {self.collection_name}")
-            except ValueError:
-                self.collection = self.client.create_collection(self.collection_name)
-                print(f"Created new collection: {self.collection_name}")
+            # Get or create the collection, with cosine distances like the built-in indexes.
+            # Embeddings are always computed by `self._embed` and passed explicitly, so the
+            # collection needs no embedding function (ChromaDB only accepts its own classes)
+            self.collection = self.client.get_or_create_collection(
+                self.collection_name,
+                embedding_function=None,
+                metadata={"hnsw:space": "cosine"}
+            )
+            # Collections created before keep their space, ChromaDB's default being L2
+            space = (self.collection.metadata or {}).get("hnsw:space")
+            if space is None:
+                hnsw = (getattr(self.collection, "configuration", None) or {}).get("hnsw") or {}
+                space = hnsw.get("space", "l2")
+            self.distance_space = space
+            print(f"Loaded collection: {self.collection_name}")
         
         except Exception as e:
             print(f"Error initializing vector database: {str(e)}")
             self.client = None
             self.collection = None
     
+    def _initialize_keyword_index(self) -> None:
+        """
+        Load the BM25 keyword index, building it from the collection if it is missing.
+        """
+        self.keyword_index = BM25Index(
+            os.path.join(self.persist_directory, f"{self.collection_name}.bm25.pkl")
+        )
+        if len(self.keyword_index) == 0 and self.collection.count() > 0:
+            existing = self.collection.get()
+            self.keyword_index.add(existing["ids"], existing["documents"], save=False)
+            self.keyword_index.save()
+    
+    def _initialize_dedup_index(self, max_distance: int) -> None:
+        """
+        Load the near-duplicate index, rebuilding it if it is out of step with the collection.
+        
+        Args:
+            max_distance: Largest SimHash distance treated as a near-duplicate
+        """
+        self.dedup_index = SimHashIndex(
+            os.path.join(self.persist_directory, f"{self.collection_name}.simhash.pkl"),
+            max_distance=max_distance
+        )
+        if len(self.dedup_index) != self.collection.count():
+            existing = self.collection.get()
+            # Drop the stale copy so the rebuilt index starts empty
+            self.dedup_index.journal.clear()
+            if os.path.exists(self.dedup_index.path):
+                os.remove(self.dedup_index.path)
+            self.dedup_index = SimHashIndex(self.dedup_index.path, max_distance=max_distance)
+            self.dedup_index.add(existing["ids"], [simhash(document) for document in existing["documents"]], save=False)
+            self.dedup_index.save()
+    
     def is_available(self) -> bool:
         """
         Check if the vector database is available.
@@ -74,6 +305,9 @@ class VectorDatabase:
         Returns:
             bool: True if available, False otherwise
         """
+        self._ensure_initialized()
+        if self.backend in (BACKEND_FLAT, BACKEND_MMAP):
+            return self.collection is not None
         return HAS_CHROMADB and self.client is not None and self.collection is not None
     
     def add_texts(self, 
@@ -84,6 +318,9 @@ class VectorDatabase:
         """
         Add texts to the vector database.
         
+        Existing IDs get the new text and embedding on every backend; ChromaDB
+        merges their metadata into the old, so use `upsert_texts` to replace it.
+        
         Args:
             texts: List of text chunks to add
             metadatas: Optional list of metadata dictionaries for each text
@@ -101,25 +338,264 @@ class VectorDatabase:
         if ids is None:
             ids = [hashlib.md5(text.encode()).hexdigest() for text in texts]
         
-        # Generate metadata if not provided
-        if metadatas is None:
-            metadatas = [{} for _ in texts]
-        
-        # Add to the collection
-        self.collection.add(
-            documents=texts,
-            metadatas=metadatas,
-            ids=ids,
-            embeddings=embeddings
-        )
+        # ChromaDB rejects empty metadata dicts, so send None instead
+        if metadatas is not None:
+            metadatas = [metadata or None for metadata in metadatas]
+        
+        if embeddings is None:
+            embeddings = self._embed(texts)
+        
+        with self.lock.write():
+            # ChromaDB's add ignores existing IDs, which would leave the keyword and
+            # dedup indexes holding texts the collection does not
+            self.collection.upsert(
+                documents=texts,
+                metadatas=metadatas,
+                ids=ids,
+                embeddings=embeddings
+            )
+            
+            if self.keyword_index is not None:
+                self.keyword_index.add(ids, texts)
+            if self.dedup_index is not None:
+                self.dedup_index.add(ids, [simhash(text) for text in texts])
         
         return ids
     
+    def upsert_texts(self, 
+                    texts: List[str], 
+                    metadatas: Optional[List[Dict[str, Any]]] = None,
+                    ids: Optional[List[str]] = None,
+                    skip_near_duplicates: bool = False,
+                    max_distance: int = 6) -> Dict[str, List[str]]:
+        """
+        Idempotently add or update texts, embedding only new or changed content.
+        
+        Each text's SHA-256 is stored in its metadata under CONTENT_HASH_KEY. Items
+        whose hash and metadata are unchanged are skipped, items whose metadata alone
+        changed are updated without re-embedding, and only new or edited texts are
+        embedded and written.
+        
+        Args:
+            texts: List of text chunks
+            metadatas: Optional list of metadata dictionaries for each text
+            ids: Optional list of IDs for each text, derived from the text if not given
+            skip_near_duplicates: Whether to drop new texts whose SimHash is within
+                `max_distance` bits of a stored or earlier text
+            max_distance: Largest SimHash distance (out of 64 bits) treated as a near-duplicate
+            
+        Returns:
+            Dict[str, List[str]]: IDs by outcome: 'added', 'updated' (text changed),
+                'metadata_updated', 'unchanged' and 'near_duplicates' (skipped)
+        """
+        report = {"added": [], "updated": [], "metadata_updated": [], "unchanged": [], "near_duplicates": []}
+        if not self.is_available():
+            print("Vector database is not available")
+            return report
+        
+        if not texts:
+            return report
+        
+        if ids is None:
+            ids = [hashlib.md5(text.encode()).hexdigest() for text in texts]
+        if metadatas is None:
+            metadatas = [None] * len(texts)
+        
+        # Compare and write under one exclusive hold so concurrent upserts cannot interleave
+        with self.lock.write():
+            # The last occurrence of an ID repeated within the call wins
+            latest = {item_id: i for i, item_id in enumerate(ids)}
+            existing = self.collection.get(ids=list(latest))
+            current = {
+                item_id: metadata or {}
+                for item_id, metadata in zip(existing["ids"], existing["metadatas"])
+            }
+            
+            if skip_near_duplicates and (self.dedup_index is None or self.dedup_index.max_distance != max_distance):
+                self._initialize_dedup_index(max_distance)
+            
+            write_texts, write_metadatas, write_ids = [], [], []
+            update_ids, update_metadatas = [], []
+            # New texts of this call, checked alongside the stored ones; the dedup index
+            # itself only learns them once the write has succeeded
+            batch_index = SimHashIndex(max_distance=max_distance) if skip_near_duplicates else None
+            for item_id, i in latest.items():
+                metadata = dict(metadatas[i] or {})
+                metadata[CONTENT_HASH_KEY] = hashlib.sha256(texts[i].encode()).hexdigest()
+                old = current.get(item_id)
+            
+                if old is not None and old.get(CONTENT_HASH_KEY) == metadata[CONTENT_HASH_KEY]:
+                    if old == metadata:
+                        report["unchanged"].append(item_id)
+                    else:
+                        # Unset keys that the new metadata no longer carries
+                        update_ids.append(item_id)
+                        update_metadatas.append({**{key: None for key in old if key not in metadata}, **metadata})
+                        report["metadata_updated"].append(item_id)
+                    continue
+            
+                # An edited text replaces itself, so only new IDs can add near-duplicate copies
+                if old is None and skip_near_duplicates:
+                    signature = simhash(texts[i])
+                    if (self.dedup_index.find(signature, exclude=item_id) is not None
+                            or batch_index.find(signature) is not None):
+                        report["near_duplicates"].append(item_id)
+                        continue
+                    batch_index.add([item_id], [signature], save=False)
+            
+                write_texts.append(texts[i])
+                write_metadatas.append(metadata)
+                write_ids.append(item_id)
+                report["added" if old is None else "updated"].append(item_id)
+                
+                # ChromaDB's upsert merges metadata, so dropped keys are unset explicitly afterwards
+                removed = [key for key in old or {} if key not in metadata]
+                if removed:
+                    update_ids.append(item_id)
+                    update_metadatas.append({key: None for key in removed})
+            
+            if write_ids:
+                self.collection.upsert(
+                    documents=write_texts,
+                    metadatas=write_metadatas,
+                    ids=write_ids,
+                    embeddings=self._embed(write_texts)
+                )
+                if self.keyword_index is not None:
+                    self.keyword_index.add(write_ids, write_texts)
+                if self.dedup_index is not None:
+                    self.dedup_index.add(write_ids, [simhash(text) for text in write_texts])
+            
+            if update_ids:
+                self.collection.update(ids=update_ids, metadatas=update_metadatas)
+        
+        return report
+    
+    def _max_batch_size(self, batch_size: int) -> int:
+        """
+        Clamp a batch size to the largest batch the backend accepts.
+        
+        Args:
+            batch_size: Requested batch size
+            
+        Returns:
+            int: The effective batch size
+        """
+        limit = getattr(self.client, "max_batch_size", None) or getattr(self.client, "get_max_batch_size", lambda: None)()
+        if limit:
+            return max(1, min(batch_size, limit))
+        return max(1, batch_size)
+    
+    def _checkpoint_path(self, checkpoint: str) -> str:
+        """
+        Get the filesystem path of an ingestion checkpoint.
+        
+        Args:
+            checkpoint: Name of the ingestion job
+            
+        Returns:
+            str: Path to the checkpoint file
+        """
+        return os.path.join(self.persist_directory, f"ingest_{checkpoint}.json")
+    
+    def add_iter(self, 
+                items: Iterable[Union[str, Tuple[str, Dict[str, Any]], Dict[str, Any]]],
+                batch_size: int = DEFAULT_BATCH_SIZE,
+                max_workers: int = 4,
+                progress_callback: Optional[Callable[[int], None]] = None,
+                checkpoint: Optional[str] = None) -> int:
+        """
+        Stream texts into the vector database in bounded batches.
+        
+        Embeddings are computed by a thread pool while earlier batches are written,
+        and at most `max_workers` batches are held in memory at a time. Items may be
+        plain texts, (text, metadata) tuples or dicts with 'text', 'metadata' and 'id'.
+        
+        Args:
+            items: Iterable (e.g. a generator) of items to ingest
+            batch_size: Number of texts embedded and written per batch
+            max_workers: Number of embedding workers
+            progress_callback: Optional callable receiving the total ingested so far
+            checkpoint: Optional job name; an interrupted job with the same name
+                resumes after the last batch that was written
+            
+        Returns:
+            int: Total number of items ingested, including resumed ones
+        """
+        if not self.is_available():
+            print("Vector database is not available")
+            return 0
+        
+        batch_size = self._max_batch_size(batch_size)
+        max_workers = max(1, max_workers)
+        
+        # Skip the items already written by an interrupted run
+        done = 0
+        checkpoint_path = self._checkpoint_path(checkpoint) if checkpoint else None
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path, "r", encoding="utf-8") as f:
+                done = json.load(f).get("offset", 0)
+            items = itertools.islice(items, done, None)
+        
+        def _embed(batch):
+            texts, metadatas, ids = zip(*(_normalize_item(item) for item in batch))
+            ids = [
+                item_id or hashlib.md5(text.encode()).hexdigest()
+                for text, item_id in zip(texts, ids)
+            ]
+            embeddings = self._embed(list(texts))
+            return list(texts), list(metadatas), ids, embeddings
+        
+        def _write(texts, metadatas, ids, embeddings):
+            nonlocal done
+            # Only the write is exclusive; searches proceed while batches are embedded
+            with self.lock.write():
+                # Upsert so that batches replayed after a crash are not duplicated
+                self.collection.upsert(
+                    documents=texts,
+                    metadatas=metadatas,
+                    ids=ids,
+                    embeddings=embeddings
+                )
+                if self.keyword_index is not None:
+                    self.keyword_index.add(ids, texts)
+                if self.dedup_index is not None:
+                    self.dedup_index.add(ids, [simhash(text) for text in texts])
+            done += len(ids)
+            if checkpoint_path:
+                with open(checkpoint_path, "w", encoding="utf-8") as f:
+                    json.dump({"offset": done}, f)
+            if progress_callback:
+                progress_callback(done)
+        
+        pending = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for batch in _batched(items, batch_size):
+                pending.append(executor.submit(_embed, batch))
+                # Write completed batches in order to keep the checkpoint offset valid
+                if len(pending) >= max_workers:
+                    _write(*pending.pop(0).result())
+            
+            while pending:
+                _write(*pending.pop(0).result())
+        
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        
+        return done
+    
     def search(self, 
               query: str, 
               n_results: int = 5,
               where: Optional[Dict[str, Any]] = None,
-              embedding: Optional[List[float]] = None) -> Dict[str, Any]:
+              embedding: Optional[List[float]] = None,
+              hybrid: Optional[bool] = None,
+              mmr: bool = False,
+              lambda_mult: float = 0.5,
+              max_distance: Optional[float] = None,
+              diversity_field: Optional[str] = None,
+              max_per_value: int = 1,
+              fetch_k: Optional[int] = None) -> Dict[str, Any]:
         """
         Search for similar texts in the database.
         
@@ -128,9 +604,22 @@ class VectorDatabase:
             n_results: Number of results to return
             where: Optional filtering criteria
             embedding: Optional pre-computed query embedding
+            hybrid: Fuse BM25 keyword and vector rankings; defaults to the database setting
+            mmr: Re-rank candidates with maximal marginal relevance to reduce redundancy
+            lambda_mult: MMR trade-off, 1.0 for pure relevance and 0.0 for pure diversity
+            max_distance: Drop results whose cosine distance (1 - cosine similarity) is
+                larger, on every backend; ChromaDB collections created with another
+                space are thresholded on cosine distances computed from their embeddings
+            diversity_field: Metadata field, e.g. 'source', whose values are capped at
+                `max_per_value` results each
+            max_per_value: Maximum results sharing one `diversity_field` value
+            fetch_k: Candidates to fetch before post-processing, defaults to
+                RERANK_CANDIDATE_FACTOR times `n_results`
             
         Returns:
-            Dict[str, Any]: Search results with 'documents', 'metadatas', 'distances', and 'ids'
+            Dict[str, Any]: Search results with 'documents', 'metadatas', 'distances', and 'ids'.
+                Hybrid results also carry fused 'scores'; their 'distances' are None
+                for documents found only by keyword.
         """
         if not self.is_available():
             print("Vector database is not available")
@@ -141,15 +630,242 @@ class VectorDatabase:
                 "ids": []
             }
         
-        results = self.collection.query(
-            query_texts=[query] if embedding is None else None,
-            query_embeddings=[embedding] if embedding is not None else None,
-            n_results=n_results,
-            where=where
-        )
+        if embedding is None:
+            embedding = self._embed([query])[0]
         
+        postprocess = mmr or max_distance is not None or diversity_field is not None
+        candidates = max(fetch_k or n_results * RERANK_CANDIDATE_FACTOR, n_results) if postprocess else n_results
+        
+        use_hybrid = self._use_hybrid(hybrid)
+        with self.lock.read():
+            results = self.collection.query(
+                query_embeddings=[embedding],
+                n_results=candidates * HYBRID_CANDIDATE_FACTOR if use_hybrid else candidates,
+                where=where
+            )
+            
+            if use_hybrid:
+                results = self._fuse(query, results, candidates, where)
+            if postprocess:
+                results = self._postprocess(
+                    results, embedding, n_results, mmr, lambda_mult, max_distance, diversity_field, max_per_value
+                )
         return results
     
+    def _postprocess(self, 
+                    results: Dict[str, Any], 
+                    embedding: List[float], 
+                    n_results: int,
+                    mmr: bool,
+                    lambda_mult: float,
+                    max_distance: Optional[float],
+                    diversity_field: Optional[str],
+                    max_per_value: int) -> Dict[str, Any]:
+        """
+        Threshold, MMR re-rank and diversity-cap a single-query result.
+        
+        Args:
+            results: search()-shaped candidates, best first
+            embedding: The query embedding
+            n_results: Number of results to return
+            mmr: Whether to re-rank with maximal marginal relevance
+            lambda_mult: MMR relevance/diversity trade-off
+            max_distance: Optional distance threshold
+            diversity_field: Optional metadata field to cap
+            max_per_value: Maximum results per `diversity_field` value
+            
+        Returns:
+            Dict[str, Any]: search()-shaped results with at most `n_results` items
+        """
+        ids = results["ids"][0] if results.get("ids") else []
+        order = np.arange(len(ids))
+        
+        if max_distance is not None and len(order):
+            distances = results["distances"][0]
+            if self.distance_space != "cosine":
+                distances = self._cosine_distances(ids, distances, embedding)
+            order = order[within_distance(distances, max_distance)]
+        
+        if mmr and len(order):
+            fetched = self.collection.get(ids=[ids[i] for i in order], include=["embeddings"])
+            vectors = dict(zip(fetched["ids"], fetched["embeddings"]))
+            order = np.array([i for i in order if ids[i] in vectors], dtype=np.int64)
+            picked = maximal_marginal_relevance(embedding, [vectors[ids[i]] for i in order], lambda_mult)
+            order = order[picked]
+        
+        if diversity_field is not None:
+            metadatas = results["metadatas"][0]
+            order = order[cap_per_value([metadatas[i] for i in order], diversity_field, max_per_value)]
+        
+        order = order[:n_results].tolist()
+        return {
+            key: [[results[key][0][i] for i in order]]
+            for key in ("ids", "documents", "metadatas", "distances", "scores")
+            if results.get(key) is not None
+        }
+    
+    def _cosine_distances(self,
+                          ids: List[str],
+                          distances: List[Optional[float]],
+                          embedding: List[float]) -> List[Optional[float]]:
+        """
+        Recompute result distances as cosine distances, for collections using another space.
+        
+        Args:
+            ids: Result ids
+            distances: The collection's distances; None (keyword-only hybrid hits) is kept
+            embedding: The query embedding
+            
+        Returns:
+            List[Optional[float]]: Cosine distances, infinite for items no longer stored
+        """
+        wanted = [item_id for item_id, distance in zip(ids, distances) if distance is not None]
+        fetched = self.collection.get(ids=wanted, include=["embeddings"])
+        vectors = dict(zip(fetched["ids"], fetched["embeddings"]))
+        
+        query = np.asarray(embedding, dtype=np.float64)
+        query_norm = np.linalg.norm(query)
+        cosine = []
+        for item_id, distance in zip(ids, distances):
+            if distance is None:
+                cosine.append(None)
+            elif item_id not in vectors:
+                cosine.append(float("inf"))
+            else:
+                vector = np.asarray(vectors[item_id], dtype=np.float64)
+                norm = query_norm * np.linalg.norm(vector)
+                cosine.append(1.0 - float(query @ vector) / norm if norm else 1.0)
+        return cosine
+    
+    def search_many(self, 
+                   queries: List[str], 
+                   n_results: int = 5,
+                   where: Optional[Dict[str, Any]] = None,
+                   embeddings: Optional[List[List[float]]] = None,
+                   hybrid: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """
+        Search for several queries with one embedding batch and one backend call.
+        
+        Args:
+            queries: The search queries
+            n_results: Number of results to return per query
+            where: Optional filtering criteria applied to every query
+            embeddings: Optional pre-computed query embeddings
+            hybrid: Fuse BM25 keyword and vector rankings; defaults to the database setting
+            
+        Returns:
+            List[Dict[str, Any]]: One result per query, in input order, each shaped like search()
+        """
+        if not self.is_available():
+            print("Vector database is not available")
+            return [
+                {"documents": [], "metadatas": [], "distances": [], "ids": []}
+                for _ in queries
+            ]
+        
+        if not queries:
+            return []
+        
+        if embeddings is None:
+            embeddings = self._embed(list(queries))
+        
+        use_hybrid = self._use_hybrid(hybrid)
+        with self.lock.read():
+            results = self.collection.query(
+                query_embeddings=list(embeddings),
+                n_results=n_results * HYBRID_CANDIDATE_FACTOR if use_hybrid else n_results,
+                where=where
+            )
+            
+            # Split the batched result into one search()-shaped dict per query
+            split = [
+                {
+                    key: [results[key][i]]
+                    for key in ("ids", "documents", "metadatas", "distances")
+                    if results.get(key) is not None
+                }
+                for i in range(len(queries))
+            ]
+            
+            if use_hybrid:
+                return [
+                    self._fuse(query, query_results, n_results, where)
+                    for query, query_results in zip(queries, split)
+                ]
+        return split
+    
+    def _use_hybrid(self, hybrid: Optional[bool]) -> bool:
+        """
+        Resolve whether a search should fuse keyword results.
+        
+        Args:
+            hybrid: Per-call override, or None for the database setting
+            
+        Returns:
+            bool: True if hybrid search applies and the keyword index exists
+        """
+        if hybrid is None:
+            hybrid = self.hybrid
+        if hybrid and self.keyword_index is None:
+            with self.lock.write():
+                if self.keyword_index is None:
+                    self._initialize_keyword_index()
+        return hybrid
+    
+    def _fuse(self, 
+             query: str, 
+             vector_results: Dict[str, Any], 
+             n_results: int,
+             where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Fuse a single-query vector result with BM25 results using reciprocal rank fusion.
+        
+        Args:
+            query: The search query
+            vector_results: search()-shaped vector results for the query
+            n_results: Number of results to return
+            where: Optional filtering criteria, also applied to keyword hits
+            
+        Returns:
+            Dict[str, Any]: search()-shaped results with an extra 'scores' list
+        """
+        vector_ids = vector_results["ids"][0]
+        known = {
+            item_id: (document, metadata, distance)
+            for item_id, document, metadata, distance in zip(
+                vector_ids,
+                vector_results["documents"][0],
+                vector_results["metadatas"][0],
+                vector_results["distances"][0]
+            )
+        }
+        
+        keyword_ids = [
+            item_id for item_id, _ in 
+            self.keyword_index.search(query, n_results * HYBRID_CANDIDATE_FACTOR)
+        ]
+        if where and keyword_ids:
+            allowed = set(self.collection.get(ids=keyword_ids, where=where)["ids"])
+            keyword_ids = [item_id for item_id in keyword_ids if item_id in allowed]
+        
+        fused = reciprocal_rank_fusion([vector_ids, keyword_ids])[:n_results]
+        
+        # Fetch documents that only the keyword index returned
+        missing = [item_id for item_id, _ in fused if item_id not in known]
+        if missing:
+            fetched = self.collection.get(ids=missing)
+            for item_id, document, metadata in zip(fetched["ids"], fetched["documents"], fetched["metadatas"]):
+                known[item_id] = (document, metadata, None)
+        
+        fused = [(item_id, score) for item_id, score in fused if item_id in known]
+        return {
+            "ids": [[item_id for item_id, _ in fused]],
+            "documents": [[known[item_id][0] for item_id, _ in fused]],
+            "metadatas": [[known[item_id][1] for item_id, _ in fused]],
+            "distances": [[known[item_id][2] for item_id, _ in fused]],
+            "scores": [[score for _, score in fused]]
+        }
+    
     def get(self, ids: List[str]) -> Dict[str, Any]:
         """
         Get documents by their IDs.
@@ -168,7 +884,8 @@ class VectorDatabase:
                 "ids": []
             }
         
-        return self.collection.get(ids=ids)
+        with self.lock.read():
+            return self.collection.get(ids=ids)
     
     def delete(self, ids: List[str]) -> None:
         """
@@ -181,7 +898,13 @@ class VectorDatabase:
             print("Vector database is not available")
             return
         
-        self.collection.delete(ids=ids)
+        with self.lock.write():
+            self.collection.delete(ids=ids)
+            
+            if self.keyword_index is not None:
+                self.keyword_index.delete(ids)
+            if self.dedup_index is not None:
+                self.dedup_index.delete(ids)
     
     def count(self) -> int:
         """
@@ -194,7 +917,78 @@ class VectorDatabase:
             print("Vector database is not available")
             return 0
         
-        return self.collection.count()
+        with self.lock.read():
+            return self.collection.count()
+    
+    def compact(self) -> None:
+        """
+        Reclaim the space of deleted and replaced items and retrain a quantized
+        index on the remaining vectors. Only the mmap backend keeps such space;
+        on other backends this does nothing.
+        """
+        if not self.is_available():
+            print("Vector database is not available")
+            return
+        
+        if self.backend != BACKEND_MMAP:
+            return
+        with self.lock.write():
+            self.collection.compact()
+    
+    async def aadd_texts(self, *args, **kwargs) -> List[str]:
+        """
+        Async version of add_texts(), run in a worker thread.
+        """
+        return await asyncio.to_thread(self.add_texts, *args, **kwargs)
+    
+    async def aupsert_texts(self, *args, **kwargs) -> Dict[str, List[str]]:
+        """
+        Async version of upsert_texts(), run in a worker thread.
+        """
+        return await asyncio.to_thread(self.upsert_texts, *args, **kwargs)
+    
+    async def aadd_iter(self, *args, **kwargs) -> int:
+        """
+        Async version of add_iter(), run in a worker thread.
+        """
+        return await asyncio.to_thread(self.add_iter, *args, **kwargs)
+    
+    async def asearch(self, *args, **kwargs) -> Dict[str, Any]:
+        """
+        Async version of search(), run in a worker thread so concurrent
+        searches overlap.
+        """
+        return await asyncio.to_thread(self.search, *args, **kwargs)
+    
+    async def asearch_many(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        """
+        Async version of search_many(), run in a worker thread.
+        """
+        return await asyncio.to_thread(self.search_many, *args, **kwargs)
+    
+    async def aget(self, *args, **kwargs) -> Dict[str, Any]:
+        """
+        Async version of get(), run in a worker thread.
+        """
+        return await asyncio.to_thread(self.get, *args, **kwargs)
+    
+    async def adelete(self, *args, **kwargs) -> None:
+        """
+        Async version of delete(), run in a worker thread.
+        """
+        return await asyncio.to_thread(self.delete, *args, **kwargs)
+    
+    async def acount(self) -> int:
+        """
+        Async version of count(), run in a worker thread.
+        """
+        return await asyncio.to_thread(self.count)
+    
+    async def acompact(self) -> None:
+        """
+        Async version of compact(), run in a worker thread.
+        """
+        return await asyncio.to_thread(self.compact)
 
-# Singleton instance
+# Singleton instance, opened lazily on first use
 vector_db = VectorDatabase()
\ No newline at end of file
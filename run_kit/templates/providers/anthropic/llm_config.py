@@ -3,13 +3,35 @@ Anthropic (Claude) configuration for LLM integration.
 """
 
 import os
+import asyncio
+import threading
+import weakref
 import anthropic
-from anthropic import Anthropic
-from typing import Dict, Any, Optional
+import httpx
+from anthropic import Anthropic, AsyncAnthropic
+from typing import Dict, Any, Optional, Iterator
 
 # Load API key from environment variables
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 
+# Connection pool shared by all requests; idle connections are kept alive so
+# consecutive turns skip the TCP and TLS handshakes
+CLIENT_MAX_CONNECTIONS = 20
+CLIENT_MAX_KEEPALIVE_CONNECTIONS = 10
+CLIENT_KEEPALIVE_EXPIRY = 120.0
+
+# Seconds to establish a connection, and overall per-request read/write/pool timeout
+CLIENT_CONNECT_TIMEOUT = 5.0
+CLIENT_TIMEOUT = 120.0
+CLIENT_MAX_RETRIES = 2
+
+_client = None
+_client_key = None
+_client_lock = threading.Lock()
+
+# Async clients hold connections bound to an event loop, so there is one per loop
+_async_clients = weakref.WeakKeyDictionary()
+
 # Model configuration
 DEFAULT_MODEL = "claude-3-opus-20240229"
 DEFAULT_PARAMS = {
@@ -18,17 +40,89 @@ DEFAULT_PARAMS = {
     "top_p": 0.95,
 }
 
+def _api_key() -> str:
+    """
+    Read the API key at call time, so a key entered in the app is picked up.
+    
+    Returns:
+        str: The API key.
+    """
+    api_key = os.getenv("ANTHROPIC_API_KEY") or ANTHROPIC_API_KEY
+    if not api_key:
+        raise ValueError("Anthropic API key not found. Please set the ANTHROPIC_API_KEY environment variable.")
+    return api_key
+
+def _pool_settings() -> Dict[str, Any]:
+    """
+    Connection pool and timeout settings shared by the sync and async clients.
+    
+    Returns:
+        Dict[str, Any]: httpx client keyword arguments.
+    """
+    return {
+        "limits": httpx.Limits(
+            max_connections=CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=CLIENT_KEEPALIVE_EXPIRY
+        ),
+        "timeout": httpx.Timeout(CLIENT_TIMEOUT, connect=CLIENT_CONNECT_TIMEOUT),
+        "follow_redirects": True
+    }
+
 def get_client() -> Anthropic:
     """
-    Get an initialized Anthropic client.
+    Get the process-wide Anthropic client, creating it on first use.
+    
+    The API key is read from the environment on every call, so a key entered
+    at runtime is picked up; the client and its connection pool are only
+    rebuilt when the key changes.
     
     Returns:
         Anthropic: The Anthropic client.
     """
-    if not ANTHROPIC_API_KEY:
-        raise ValueError("Anthropic API key not found. Please set the ANTHROPIC_API_KEY environment variable.")
+    global _client, _client_key
     
-    return Anthropic(api_key=ANTHROPIC_API_KEY)
+    api_key = _api_key()
+    
+    with _client_lock:
+        if _client is None or _client_key != api_key:
+            settings = _pool_settings()
+            # The previous client is left to the garbage collector rather than
+            # closed, since other threads may still be using it
+            _client = Anthropic(
+                api_key=api_key,
+                http_client=httpx.Client(**settings),
+                timeout=settings["timeout"],
+                max_retries=CLIENT_MAX_RETRIES
+            )
+            _client_key = api_key
+        return _client
+
+def get_async_client() -> AsyncAnthropic:
+    """
+    Get the async Anthropic client for the running event loop, creating it on first use.
+    
+    Must be called from a coroutine. Like `get_client`, the client is rebuilt
+    when the API key changes.
+    
+    Returns:
+        AsyncAnthropic: The async Anthropic client.
+    """
+    api_key = _api_key()
+    loop = asyncio.get_running_loop()
+    
+    with _client_lock:
+        entry = _async_clients.get(loop)
+        if entry is None or entry[0] != api_key:
+            settings = _pool_settings()
+            entry = (api_key, AsyncAnthropic(
+                api_key=api_key,
+                http_client=httpx.AsyncClient(**settings),
+                timeout=settings["timeout"],
+                max_retries=CLIENT_MAX_RETRIES
+            ))
+            _async_clients[loop] = entry
+        return entry[1]
 
 def get_anthropic_response(prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
     """
@@ -59,4 +153,65 @@ def get_anthropic_response(prompt: str, params: Optional[Dict[str, Any]] = None)
         ]
     )
     
-    return response.content[0].text
\ No newline at end of file
+    return response.content[0].text
+
+async def aget_anthropic_response(prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Get a response from Anthropic's Claude without blocking the event loop.
+    
+    Args:
+        prompt: The user's input prompt
+        params: Optional parameters to override defaults
+    
+    Returns:
+        str: The AI response
+    """
+    client = get_async_client()
+    
+    # Merge default params with any provided params
+    request_params = DEFAULT_PARAMS.copy()
+    if params:
+        request_params.update(params)
+    
+    # Create message
+    response = await client.messages.create(
+        model=DEFAULT_MODEL,
+        max_tokens=request_params["max_tokens"],
+        temperature=request_params["temperature"],
+        system="You are a helpful AI assistant.",
+        messages=[
+            {"role": "user", "content": prompt}
+        ]
+    )
+    
+    return response.content[0].text
+
+def stream_anthropic_response(prompt: str, params: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """
+    Stream a response from Anthropic's Claude as it is generated.
+    
+    Args:
+        prompt: The user's input prompt
+        params: Optional parameters to override defaults
+    
+    Returns:
+        Iterator[str]: Text deltas, e.g. for st.write_stream
+    """
+    client = get_client()
+    
+    # Merge default params with any provided params
+    request_params = DEFAULT_PARAMS.copy()
+    if params:
+        request_params.update(params)
+    
+    with client.messages.stream(
+        model=DEFAULT_MODEL,
+        max_tokens=request_params["max_tokens"],
+        temperature=request_params["temperature"],
+        system="You are a helpful AI assistant.",
+        messages=[
+            {"role": "user", "content": prompt}
+        ]
+    ) as stream:
+        for text in stream.text_stream:
+            yield text
\ No newline at end of file
@@ -0,0 +1,172 @@
+"""
+Common async interface over the generated LLM providers, with concurrent fan-out.
+"""
+
+import asyncio
+import functools
+import importlib
+import threading
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Iterable, Iterator, Union
+
+# Async response function of each provider's llm_config module
+ASYNC_FUNCTIONS = {
+    "anthropic": "aget_anthropic_response",
+    "gemini": "aget_gemini_response",
+    "ollama": "aget_ollama_response",
+}
+
+# Streaming function of each provider, with keyword arguments that make it raise on errors
+STREAM_FUNCTIONS = {
+    "anthropic": ("stream_anthropic_response", {}),
+    "gemini": ("stream_gemini_response", {}),
+    "ollama": ("stream_ollama_response", {"raise_errors": True}),
+}
+
+# Requests in flight at once in `gather_responses`
+DEFAULT_CONCURRENCY = 4
+
+_providers = None
+_stream_providers = None
+
+# Event loop shared by synchronous callers, so async clients and their connections are reused
+_loop = None
+_loop_lock = threading.Lock()
+
+def _find_functions(function_names: Dict[str, str]) -> Dict[str, Callable[..., Any]]:
+    """
+    Look up a function in each provider's llm_config module.
+    
+    A single provider lives in app.llm.llm_config and several in
+    app.llm.<provider>.llm_config; providers whose SDK is not installed are skipped.
+    
+    Args:
+        function_names: Function name per provider name
+    
+    Returns:
+        Dict[str, Callable[..., Any]]: Function per available provider name
+    """
+    functions = {}
+    for name, function_name in function_names.items():
+        for module_name in (f"app.llm.{name}.llm_config", "app.llm.llm_config"):
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError:
+                continue
+            if hasattr(module, function_name):
+                functions[name] = getattr(module, function_name)
+                break
+    return functions
+
+def get_providers() -> Dict[str, Callable[..., Awaitable[str]]]:
+    """
+    Find the providers generated into this app.
+    
+    Returns:
+        Dict[str, Callable[..., Awaitable[str]]]: Async response function per provider name
+    """
+    global _providers
+    
+    if _providers is None:
+        _providers = _find_functions(ASYNC_FUNCTIONS)
+    return _providers
+
+def get_stream_providers() -> Dict[str, Callable[..., Iterator[str]]]:
+    """
+    Find the streaming functions of the providers generated into this app.
+    
+    The functions raise on errors rather than yielding an error message.
+    
+    Returns:
+        Dict[str, Callable[..., Iterator[str]]]: Streaming function per provider name
+    """
+    global _stream_providers
+    
+    if _stream_providers is None:
+        names = {name: function_name for name, (function_name, _) in STREAM_FUNCTIONS.items()}
+        _stream_providers = {
+            name: functools.partial(function, **STREAM_FUNCTIONS[name][1])
+            for name, function in _find_functions(names).items()
+        }
+    return _stream_providers
+
+async def agenerate(prompt: str, provider: Optional[str] = None, params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Get a response from a provider.
+    
+    Args:
+        prompt: The user's input prompt
+        provider: Provider name ('anthropic', 'gemini' or 'ollama'), defaults to
+            the first available one
+        params: Optional parameters to override the provider's defaults
+    
+    Returns:
+        str: The AI response
+    """
+    providers = get_providers()
+    if not providers:
+        raise RuntimeError("No LLM provider is available. Please check your installation.")
+    if provider is None:
+        provider = next(iter(providers))
+    elif provider not in providers:
+        raise ValueError(f"Provider not available: {provider}")
+    
+    return await providers[provider](prompt, params)
+
+async def gather_responses(prompts: Iterable[str],
+                           provider: Optional[str] = None,
+                           params: Optional[Dict[str, Any]] = None,
+                           concurrency: int = DEFAULT_CONCURRENCY,
+                           return_exceptions: bool = False) -> List[Union[str, BaseException]]:
+    """
+    Get responses to several independent prompts concurrently.
+    
+    Args:
+        prompts: The prompts
+        provider: Provider name, defaults to the first available one
+        params: Optional parameters to override the provider's defaults
+        concurrency: Maximum requests in flight at once
+        return_exceptions: Return failures in place of their response instead
+            of raising the first one
+    
+    Returns:
+        List[Union[str, BaseException]]: Responses in the order of the prompts
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    async def _generate(prompt):
+        async with semaphore:
+            return await agenerate(prompt, provider, params)
+    
+    return await asyncio.gather(*(_generate(prompt) for prompt in prompts), return_exceptions=return_exceptions)
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """
+    Get the shared event loop, starting it on a daemon thread on first use.
+    
+    Returns:
+        asyncio.AbstractEventLoop: The running loop
+    """
+    global _loop
+    
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, daemon=True).start()
+            _loop = loop
+        return _loop
+
+def run_async(coroutine: Awaitable[Any]) -> Any:
+    """
+    Run a coroutine to completion from synchronous code, such as a Streamlit script.
+    
+    Coroutines run on one long-lived background loop rather than a new loop
+    per call, so the per-loop async clients keep their connections alive.
+    Safe to call from inside another event loop, which it blocks until done.
+    
+    Args:
+        coroutine: The coroutine
+    
+    Returns:
+        Any: Its result
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, _background_loop()).result()
\ No newline at end of file
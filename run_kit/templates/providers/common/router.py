@@ -0,0 +1,348 @@
+"""
+Routing across several LLM providers: failover, hedged requests and races.
+"""
+
+import os
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Iterator
+
+from app.llm.providers import get_providers, get_stream_providers, run_async
+
+# Routing strategies: try providers one after another when one fails; also
+# start the next provider when the current one is slower than usual; or start
+# every provider at once. In all of them the first successful response wins.
+STRATEGY_FAILOVER = "failover"
+STRATEGY_HEDGED = "hedged"
+STRATEGY_RACE = "race"
+STRATEGIES = (STRATEGY_FAILOVER, STRATEGY_HEDGED, STRATEGY_RACE)
+
+# Provider preference and strategy, overridable from the environment
+PROVIDER_ORDER = os.getenv("LLM_PROVIDER_ORDER", "anthropic,gemini,ollama")
+ROUTING_STRATEGY = os.getenv("LLM_ROUTING_STRATEGY", STRATEGY_HEDGED)
+
+# A hedge is sent once the pending provider exceeds this percentile of its recent latencies
+HEDGE_PERCENTILE = 0.95
+
+# Seconds to wait before hedging until a provider has MIN_LATENCY_SAMPLES recorded
+DEFAULT_HEDGE_DELAY = 2.0
+MIN_LATENCY_SAMPLES = 20
+
+# Latencies remembered per provider
+LATENCY_WINDOW = 200
+
+class LatencyTracker:
+    """
+    Keeps a rolling window of successful request latencies per provider.
+    """
+    
+    def __init__(self, window: int = LATENCY_WINDOW):
+        """
+        Initialize the tracker.
+        
+        Args:
+            window: Latencies remembered per provider
+        """
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+    
+    def record(self, provider: str, seconds: float):
+        """
+        Record a latency.
+        
+        Args:
+            provider: Provider name
+            seconds: Latency in seconds
+        """
+        with self._lock:
+            samples = self._samples.get(provider)
+            if samples is None:
+                samples = self._samples[provider] = deque(maxlen=self.window)
+            samples.append(seconds)
+    
+    def percentile(self, provider: str, q: float) -> Optional[float]:
+        """
+        Get a latency percentile by the nearest-rank method.
+        
+        Args:
+            provider: Provider name
+            q: Percentile between 0 and 1, e.g. 0.95
+        
+        Returns:
+            Optional[float]: The latency in seconds, or None with fewer than
+                MIN_LATENCY_SAMPLES recorded
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(provider, ()))
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        rank = min(len(samples) - 1, max(0, int(q * len(samples) + 0.5) - 1))
+        return samples[rank]
+
+class ProviderRouter:
+    """
+    Sends each request to the generated providers by preference, with failover,
+    hedging on a latency percentile, or racing.
+    
+    Only the winning response is returned; slower attempts are cancelled (or,
+    for streams running on threads, abandoned at their next chunk).
+    """
+    
+    def __init__(self,
+                 order: Optional[List[str]] = None,
+                 strategy: str = ROUTING_STRATEGY,
+                 hedge_percentile: float = HEDGE_PERCENTILE,
+                 default_hedge_delay: float = DEFAULT_HEDGE_DELAY):
+        """
+        Initialize the router.
+        
+        Args:
+            order: Provider names by preference; available providers not listed come last
+            strategy: Default strategy, one of STRATEGIES
+            hedge_percentile: Latency percentile after which a hedge is sent
+            default_hedge_delay: Seconds before hedging while too few latencies are known
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown routing strategy: {strategy}")
+        if order is None:
+            order = [name.strip() for name in PROVIDER_ORDER.split(",") if name.strip()]
+        self.order = order
+        self.strategy = strategy
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.latencies = LatencyTracker()
+        self.first_token_latencies = LatencyTracker()
+    
+    def _ordered(self, available: Dict[str, Any]) -> List[str]:
+        """
+        Order the available providers by preference.
+        
+        Args:
+            available: Function per available provider name
+        
+        Returns:
+            List[str]: Provider names
+        """
+        names = [name for name in self.order if name in available]
+        names += [name for name in available if name not in names]
+        if not names:
+            raise RuntimeError("No LLM provider is available. Please check your installation.")
+        return names
+    
+    def _hedge_delay(self, provider: str, strategy: str, tracker: LatencyTracker) -> Optional[float]:
+        """
+        Seconds to wait for a provider before starting the next one.
+        
+        Args:
+            provider: The provider last started
+            strategy: The routing strategy
+            tracker: Latencies to derive the delay from
+        
+        Returns:
+            Optional[float]: The delay, or None to wait until it finishes
+        """
+        if strategy == STRATEGY_RACE:
+            return 0.0
+        if strategy == STRATEGY_FAILOVER:
+            return None
+        delay = tracker.percentile(provider, self.hedge_percentile)
+        return self.default_hedge_delay if delay is None else delay
+    
+    async def agenerate(self,
+                        prompt: str,
+                        params: Optional[Dict[str, Any]] = None,
+                        strategy: Optional[str] = None) -> str:
+        """
+        Get a response from the first provider to answer successfully.
+        
+        Args:
+            prompt: The user's input prompt
+            params: Optional parameters to override the providers' defaults
+            strategy: Routing strategy, defaults to the router's
+        
+        Returns:
+            str: The AI response
+        
+        Raises:
+            Exception: The last provider's error when every provider fails
+        """
+        strategy = strategy or self.strategy
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown routing strategy: {strategy}")
+        providers = get_providers()
+        names = self._ordered(providers)
+        
+        pending = {}
+        started = 0
+        last_error = None
+        
+        def _start():
+            nonlocal started
+            name = names[started]
+            started += 1
+            task = asyncio.ensure_future(providers[name](prompt, params))
+            pending[task] = (name, time.perf_counter())
+        
+        _start()
+        try:
+            while pending:
+                delay = None
+                if started < len(names):
+                    delay = self._hedge_delay(names[started - 1], strategy, self.latencies)
+                done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # The pending provider is slower than usual: hedge with the next one
+                    _start()
+                    continue
+                
+                for task in done:
+                    name, start = pending.pop(task)
+                    if task.exception() is None:
+                        self.latencies.record(name, time.perf_counter() - start)
+                        return task.result()
+                    last_error = task.exception()
+                    print(f"Error from LLM provider {name}: {str(last_error)}")
+                    # Fail over to the next provider right away
+                    if started < len(names):
+                        _start()
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        raise last_error
+    
+    def generate(self,
+                 prompt: str,
+                 params: Optional[Dict[str, Any]] = None,
+                 strategy: Optional[str] = None) -> str:
+        """
+        Get a response from the first provider to answer successfully, from synchronous code.
+        
+        Args:
+            prompt: The user's input prompt
+            params: Optional parameters to override the providers' defaults
+            strategy: Routing strategy, defaults to the router's
+        
+        Returns:
+            str: The AI response
+        """
+        return run_async(self.agenerate(prompt, params, strategy))
+    
+    def stream(self,
+               prompt: str,
+               params: Optional[Dict[str, Any]] = None,
+               strategy: Optional[str] = None) -> Iterator[str]:
+        """
+        Stream a response from the first provider to produce text.
+        
+        Strategies apply to the time to the first chunk. Once a provider has
+        produced text it is the only one streamed, so an error after that
+        point is raised rather than failed over.
+        
+        Args:
+            prompt: The user's input prompt
+            params: Optional parameters to override the providers' defaults
+            strategy: Routing strategy, defaults to the router's
+        
+        Returns:
+            Iterator[str]: Text deltas, e.g. for st.write_stream
+        """
+        strategy = strategy or self.strategy
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown routing strategy: {strategy}")
+        providers = get_stream_providers()
+        names = self._ordered(providers)
+        
+        events = queue.Queue()
+        # Read by the worker threads: stop once another provider won or the caller is gone
+        state = {"winner": None, "closed": False}
+        running = {}
+        started = 0
+        last_error = None
+        
+        def _consume(name):
+            try:
+                for chunk in providers[name](prompt, params):
+                    if state["closed"] or state["winner"] not in (None, name):
+                        return
+                    events.put((name, chunk, None))
+                events.put((name, None, None))
+            except Exception as e:
+                events.put((name, None, e))
+        
+        def _start():
+            nonlocal started
+            name = names[started]
+            started += 1
+            running[name] = time.perf_counter()
+            threading.Thread(target=_consume, args=(name,), daemon=True).start()
+        
+        _start()
+        try:
+            while running:
+                delay = None
+                if state["winner"] is None and started < len(names):
+                    delay = self._hedge_delay(names[started - 1], strategy, self.first_token_latencies)
+                try:
+                    name, chunk, error = events.get(timeout=delay)
+                except queue.Empty:
+                    # No text yet from the pending provider: hedge with the next one
+                    _start()
+                    continue
+                
+                if state["winner"] is None:
+                    if error is not None:
+                        del running[name]
+                        last_error = error
+                        print(f"Error from LLM provider {name}: {str(error)}")
+                        # Fail over to the next provider right away
+                        if started < len(names):
+                            _start()
+                        continue
+                    state["winner"] = name
+                    self.first_token_latencies.record(name, time.perf_counter() - running[name])
+                elif name != state["winner"]:
+                    continue
+                
+                if error is not None:
+                    raise error
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            state["closed"] = True
+        
+        raise last_error
+
+# Shared router, so latency statistics accumulate across requests
+router = ProviderRouter()
+
+def get_routed_response(prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Get a response from the generated providers through the shared router.
+    
+    Args:
+        prompt: The user's input prompt
+        params: Optional parameters to override defaults
+    
+    Returns:
+        str: The AI response
+    """
+    return router.generate(prompt, params)
+
+def stream_routed_response(prompt: str, params: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """
+    Stream a response from the generated providers through the shared router.
+    
+    Args:
+        prompt: The user's input prompt
+        params: Optional parameters to override defaults
+    
+    Returns:
+        Iterator[str]: Text deltas, e.g. for st.write_stream
+    """
+    return router.stream(prompt, params)
\ No newline at end of file
@@ -4,7 +4,7 @@ Google (Gemini) configuration for LLM integration.
 
 import os
 import google.generativeai as genai
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Iterator
 
 # Load API key from environment variables
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
@@ -55,4 +55,68 @@ def get_gemini_response(prompt: str, params: Optional[Dict[str, Any]] = None) ->
     # Generate response
     response = model.generate_content(prompt)
     
-    return response.text
\ No newline at end of file
+    return response.text
+
+async def aget_gemini_response(prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Get a response from Google's Gemini without blocking the event loop.
+    
+    Args:
+        prompt: The user's input prompt
+        params: Optional parameters to override defaults
+    
+    Returns:
+        str: The AI response
+    """
+    # Initialize the client
+    initialize_genai()
+    
+    # Merge default params with any provided params
+    request_params = DEFAULT_PARAMS.copy()
+    if params:
+        request_params.update(params)
+    
+    # Configure the model
+    model = genai.GenerativeModel(
+        model_name=DEFAULT_MODEL,
+        generation_config=request_params
+    )
+    
+    # Generate response
+    response = await model.generate_content_async(prompt)
+    
+    return response.text
+
+def stream_gemini_response(prompt: str, params: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """
+    Stream a response from Google's Gemini as it is generated.
+    
+    Args:
+        prompt: The user's input prompt
+        params: Optional parameters to override defaults
+    
+    Returns:
+        Iterator[str]: Text deltas, e.g. for st.write_stream
+    """
+    # Initialize the client
+    initialize_genai()
+    
+    # Merge default params with any provided params
+    request_params = DEFAULT_PARAMS.copy()
+    if params:
+        request_params.update(params)
+    
+    # Configure the model
+    model = genai.GenerativeModel(
+        model_name=DEFAULT_MODEL,
+        generation_config=request_params
+    )
+    
+    for chunk in model.generate_content(prompt, stream=True):
+        # Chunks without text parts (e.g. only safety ratings) raise on .text
+        try:
+            text = chunk.text
+        except ValueError:
+            continue
+        if text:
+            yield text
\ No newline at end of file
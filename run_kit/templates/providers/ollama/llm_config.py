@@ -3,52 +3,262 @@ Ollama configuration for local LLM integration.
 """
 
 import os
+import asyncio
+import json
+import threading
 import requests
-from typing import Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, Any, Optional, Iterator
 
 # Load configuration from environment variables
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
 
+# How long Ollama keeps the model loaded after a request (e.g. "30m", "-1" for ever)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# Whether apps preload the model at startup
+OLLAMA_WARM_UP = os.getenv("OLLAMA_WARM_UP", "true").lower() in ("1", "true", "yes")
+
+# Seconds to connect, and to wait for the response (between chunks when streaming);
+# generous because CPU-only machines can take minutes to load and run a model
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 300.0
+
+# Failed connection attempts are retried with backoff; nothing is retried once
+# a request has reached the server, since generating is not idempotent
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.5
+
 # Model configuration
 DEFAULT_PARAMS = {
-    "temperature": la.7,
+    "temperature": 0.7,
     "max_tokens": 1024,
     "top_p": 0.95,
     "stream": False,
 }
 
-def get_ollama_response(prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+# Ollama's names for parameters that differ from DEFAULT_PARAMS
+OPTION_NAMES = {
+    "max_tokens": "num_predict",
+}
+
+_session = None
+_session_lock = threading.Lock()
+_warmed_up = set()
+
+def get_session() -> requests.Session:
     """
-    Get a response from a local Ollama instance.
+    Get the process-wide HTTP session, creating it on first use.
+    
+    The session keeps connections to Ollama alive between requests and
+    retries connections that could not be established.
+    
+    Returns:
+        requests.Session: The session.
+    """
+    global _session
+    
+    with _session_lock:
+        if _session is None:
+            # Only connect errors are retried: a read error or 5xx from a proxy
+            # may come after generation started, and POSTing again would run it twice
+            retry = Retry(
+                total=MAX_RETRIES,
+                connect=MAX_RETRIES,
+                read=0,
+                status=0,
+                other=0,
+                backoff_factor=RETRY_BACKOFF,
+                raise_on_status=False
+            )
+            session = requests.Session()
+            session.mount("http://", HTTPAdapter(pool_maxsize=10, max_retries=retry))
+            session.mount("https://", HTTPAdapter(pool_maxsize=10, max_retries=retry))
+            _session = session
+        return _session
+
+def _build_payload(prompt: str, params: Optional[Dict[str, Any]], stream: bool) -> Dict[str, Any]:
+    """
+    Build a /api/generate request body.
+    
+    Sampling parameters go under "options", where Ollama reads them.
     
     Args:
         prompt: The user's input prompt
         params: Optional parameters to override defaults
+        stream: Whether to stream the response
     
     Returns:
-        str: The AI response
+        Dict[str, Any]: The request payload
     """
     # Merge default params with any provided params
     request_params = DEFAULT_PARAMS.copy()
     if params:
         request_params.update(params)
+    request_params.pop("stream", None)
+    keep_alive = request_params.pop("keep_alive", os.getenv("OLLAMA_KEEP_ALIVE", OLLAMA_KEEP_ALIVE))
     
-    # Build the request payload
-    payload = {
-        "model": OLLAMA_MODEL,
+    return {
+        "model": os.getenv("OLLAMA_MODEL", OLLAMA_MODEL),
         "prompt": prompt,
-        **request_params
+        "stream": stream,
+        "keep_alive": keep_alive,
+        "options": {OPTION_NAMES.get(name, name): value for name, value in request_params.items()}
     }
+
+def _generate_url() -> str:
+    """
+    Get the generate endpoint, reading the base URL at call time so changes in the app apply.
+    
+    Returns:
+        str: The endpoint URL
+    """
+    return f"{os.getenv('OLLAMA_BASE_URL', OLLAMA_BASE_URL).rstrip('/')}/api/generate"
+
+def warm_up_ollama(background: bool = True) -> bool:
+    """
+    Preload the model so the first question does not wait for it to load.
     
-    # Make the API request to Ollama
-    url = f"{OLLAMA_BASE_URL}/api/generate"
+    A generate request without a prompt only loads the model and applies
+    keep_alive. Each model is warmed up at most once per process.
     
-    try:
-        response = requests.post(url, json=payload)
+    Args:
+        background: Send the request from a daemon thread and return immediately
+    
+    Returns:
+        bool: Whether the model was loaded (always True when started in the background)
+    """
+    model = os.getenv("OLLAMA_MODEL", OLLAMA_MODEL)
+    with _session_lock:
+        if model in _warmed_up:
+            return True
+        _warmed_up.add(model)
+    
+    def _load() -> bool:
+        try:
+            response = get_session().post(
+                _generate_url(),
+                json={"model": model, "keep_alive": os.getenv("OLLAMA_KEEP_ALIVE", OLLAMA_KEEP_ALIVE)},
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+            )
+            response.raise_for_status()
+            return True
+        except requests.exceptions.RequestException as e:
+            print(f"Error warming up Ollama model {model}: {str(e)}")
+            # Allow a later retry, e.g. once Ollama is started
+            with _session_lock:
+                _warmed_up.discard(model)
+            return False
+    
+    if background:
+        threading.Thread(target=_load, daemon=True).start()
+        return True
+    return _load()
+
+def _generate(prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Request a complete response, raising on connection and HTTP errors.
+    
+    Args:
+        prompt: The user's input prompt
+        params: Optional parameters to override defaults
+    
+    Returns:
+        str: The AI response
+    """
+    payload = _build_payload(prompt, params, stream=False)
+    response = get_session().post(_generate_url(), json=payload, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+    response.raise_for_status()
+    return response.json().get("response", "No response generated")
+
+def _stream(prompt: str, params: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """
+    Request a streamed response, raising on connection and HTTP errors.
+    
+    Args:
+        prompt: The user's input prompt
+        params: Optional parameters to override defaults
+    
+    Returns:
+        Iterator[str]: Text deltas
+    """
+    payload = _build_payload(prompt, params, stream=True)
+    
+    # Ollama streams one JSON object per line until one has "done": true
+    with get_session().post(_generate_url(), json=payload, stream=True,
+                            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)) as response:
         response.raise_for_status()
-        return response.json().get("response", "No response generated")
+        # chunk_size=None yields data as it arrives instead of buffering 512 bytes
+        for line in response.iter_lines(chunk_size=None):
+            if not line:
+                continue
+            data = json.loads(line)
+            if data.get("response"):
+                yield data["response"]
+            if data.get("done"):
+                break
+
+def get_ollama_response(prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Get a response from a local Ollama instance.
+    
+    Args:
+        prompt: The user's input prompt
+        params: Optional parameters to override defaults
+    
+    Returns:
+        str: The AI response
+    """
+    try:
+        return _generate(prompt, params)
+    except requests.exceptions.RequestException as e:
+        error_msg = f"Error connecting to Ollama: {str(e)}"
+        print(error_msg)
+        return f"Error: {error_msg}. Make sure Ollama is running locally and the model is available."
+
+async def aget_ollama_response(prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Get a response from a local Ollama instance without blocking the event loop.
+    
+    The request runs on a worker thread over the shared pooled session, so
+    concurrent calls overlap without another HTTP dependency. Unlike
+    `get_ollama_response`, errors are raised so callers can fail over.
+    
+    Args:
+        prompt: The user's input prompt
+        params: Optional parameters to override defaults
+    
+    Returns:
+        str: The AI response
+    
+    Raises:
+        requests.exceptions.RequestException: If Ollama cannot be reached or fails
+    """
+    return await asyncio.to_thread(_generate, prompt, params)
+
+def stream_ollama_response(prompt: str,
+                           params: Optional[Dict[str, Any]] = None,
+                           raise_errors: bool = False) -> Iterator[str]:
+    """
+    Stream a response from a local Ollama instance as it is generated.
+    
+    Args:
+        prompt: The user's input prompt
+        params: Optional parameters to override defaults
+        raise_errors: Raise connection errors instead of yielding an error message
+    
+    Returns:
+        Iterator[str]: Text deltas, e.g. for st.write_stream
+    """
+    if raise_errors:
+        yield from _stream(prompt, params)
+        return
+    
+    try:
+        yield from _stream(prompt, params)
     except requests.exceptions.RequestException as e:
         error_msg = f"Error connecting to Ollama: {str(e)}"
         print(error_msg)
-        return f"Error: {error_msg}. Make sure Ollama is running locally and the model is available."
\ No newline at end of file
+        yield f"Error: {error_msg}. Make sure Ollama is running locally and the model is available."
\ No newline at end of file
@@ -94,7 +94,7 @@ def merge_requirements(requirement_files: List[str]) -> str:
                 requirements.add("google-generativeai>=0.3.0")
                 
     # Always include base requirements
-    requirements.add("streamlit>=1.24.0")
+    requirements.add("streamlit>=1.31.0")
     requirements.add("python-dotenv>=1.0.0")
     requirements.add("requests>=2.31.0")
     
@@ -121,7 +121,7 @@ def generate_project_structure(
         context: Context variables for templating
     """
     from run_kit.constants import (
-        PROVIDER_DIRS, FEATURE_DIRS, PROJECT_TYPE_FILES,
+        PROVIDER_DIRS, PROVIDER_COMMON_DIR, FEATURE_DIRS, PROJECT_TYPE_FILES,
         TEMPLATE_BASE_PATH, TEMPLATE_PROVIDERS_PATH, TEMPLATE_FEATURES_PATH,
         TEMPLATE_PROJECT_TYPES_PATH
     )
@@ -219,7 +219,7 @@ OLLAMA_BASE_URL=http://localhost:11434
         
         # Create requirements.txt
         requirements = """
-streamlit>=1.24.0
+streamlit>=1.31.0
 python-dotenv>=1.0.0
 requests>=2.31.0
 """
@@ -245,7 +245,10 @@ requests>=2.31.0
     # Create the basic directory structure
     for dir_path in ["app", "app/components", "app/llm", "app/utils", "app/data", "app/styles", "tests"]:
         create_directory(os.path.join(project_path, dir_path))
-    
+
+    # Make app/ a regular package so `app.*` imports resolve to it rather than to app.py
+    create_file(os.path.join(project_path, "app", "__init__.py"))
+
     # Add provider-specific files
     provider_dir = PROVIDER_DIRS[provider]
     if isinstance(provider_dir, list):
@@ -275,6 +278,16 @@ requests>=2.31.0
         except FileNotFoundError:
             print(f"Warning: Provider template directory not found: {provider_templates_dir}")
     
+    # Add the common provider interface next to the provider modules
+    common_templates_dir = os.path.join(TEMPLATE_PROVIDERS_PATH, PROVIDER_COMMON_DIR)
+    try:
+        for template_file in os.listdir(common_templates_dir):
+            src_path = os.path.join(common_templates_dir, template_file)
+            dest_path = os.path.join(project_path, "app/llm", template_file)
+            copy_template_file(src_path, dest_path, context)
+    except FileNotFoundError:
+        print(f"Warning: Provider template directory not found: {common_templates_dir}")
+    
     # Add feature-specific files
     for feature in features:
         feature_dir = FEATURE_DIRS[feature]
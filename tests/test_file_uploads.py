@@ -0,0 +1,119 @@
+"""
+Tests for FileProcessor in the file_uploads feature template.
+
+The template imports itself as `app.file_uploads`, as in a generated project,
+so the tests copy it into a temporary `app` package.
+"""
+
+import importlib
+import os
+import shutil
+import sys
+import threading
+
+import pytest
+
+TEMPLATE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "run_kit", "templates", "features", "file_uploads"
+)
+
+
+@pytest.fixture
+def file_processor(tmp_path, monkeypatch):
+    """Import the file_uploads template as app.file_uploads.file_processor."""
+    package = tmp_path / "pkg" / "app"
+    shutil.copytree(TEMPLATE_DIR, package / "file_uploads", ignore=shutil.ignore_patterns("__pycache__", "*.txt"))
+    (package / "__init__.py").write_text("")
+    (package / "file_uploads" / "__init__.py").write_text("")
+    monkeypatch.syspath_prepend(str(tmp_path / "pkg"))
+    for name in [name for name in sys.modules if name == "app" or name.startswith("app.")]:
+        monkeypatch.delitem(sys.modules, name)
+    return importlib.import_module("app.file_uploads.file_processor")
+
+
+def test_excel_metadata_without_cell_data(file_processor, tmp_path, monkeypatch):
+    openpyxl = pytest.importorskip("openpyxl")
+
+    path = str(tmp_path / "book.xlsx")
+    workbook = openpyxl.Workbook()
+    workbook.active.title = "first"
+    workbook.active.append(["name", "value"])
+    for i in range(10):
+        workbook.active.append([f"row {i}", i])
+    workbook.create_sheet("second").append(["only"])
+    workbook.save(path)
+
+    def _no_parsing(*args, **kwargs):
+        raise AssertionError("cell data was parsed")
+
+    monkeypatch.setattr(file_processor.pd, "ExcelFile", _no_parsing)
+    metadata = file_processor.FileProcessor(str(tmp_path / "uploads")).get_excel_metadata(path)
+
+    assert metadata["sheets"] == ["first", "second"]
+    assert metadata["sheet_count"] == 2
+    assert metadata["sheet_details"]["first"] == {"rows": 10, "columns": 2, "column_names": ["name", "value"]}
+    assert metadata["sheet_details"]["second"] == {"rows": 0, "columns": 1, "column_names": ["only"]}
+
+
+@pytest.mark.parametrize("headers", [["name", "value"], [0, 1]])
+def test_cached_frame_rejects_unknown_columns(file_processor, tmp_path, headers):
+    processing_cache = importlib.import_module("app.file_uploads.processing_cache")
+    df = file_processor.pd.DataFrame({headers[0]: ["a", "b", "c"], headers[1]: [1, 2, 3]})
+
+    cache = processing_cache.ProcessingCache(str(tmp_path / "cache"), "test")
+    cache.put("hash", "csv", df, {"rows": 3})
+
+    projected = cache.get_frame("hash", "csv", columns=[headers[1]])
+    assert list(projected.columns) == [headers[1]]
+    assert projected[headers[1]].tolist() == [1, 2, 3]
+
+    with pytest.raises(KeyError, match="Unknown columns: missing"):
+        cache.get_frame("hash", "csv", columns=[headers[0], "missing"])
+
+
+def test_unreadable_cache_entry_is_discarded(file_processor, tmp_path):
+    processing_cache = importlib.import_module("app.file_uploads.processing_cache")
+    cache = processing_cache.ProcessingCache(str(tmp_path / "cache"), "test")
+    cache.put("hash", "txt", "some text", {"char_count": 9})
+    entry = cache._entry_dir("hash", "txt")
+    os.remove(os.path.join(entry, "content.txt"))
+
+    assert cache.get("hash", "txt") is None
+    assert not os.path.exists(entry)
+
+    cache.put("hash", "txt", "some text", {"char_count": 9})
+    assert cache.get("hash", "txt") == ("some text", {"char_count": 9})
+
+
+def test_pdf_page_timeout_uses_pool_off_main_thread(file_processor, tmp_path, monkeypatch):
+    pypdf = pytest.importorskip("pypdf")
+
+    path = str(tmp_path / "small.pdf")
+    writer = pypdf.PdfWriter()
+    for _ in range(3):
+        writer.add_blank_page(width=200, height=200)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+    pools = []
+
+    class RecordingPool(file_processor.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            pools.append(self)
+
+    monkeypatch.setattr(file_processor, "ProcessPoolExecutor", RecordingPool)
+    processor = file_processor.FileProcessor(str(tmp_path / "uploads"), use_cache=False)
+
+    # On the main thread SIGALRM works, so a small PDF is extracted in-process
+    text, metadata = processor._process_pdf(path)
+    assert metadata["pages"] == 3 and not pools
+
+    # Streamlit runs scripts on another thread, where only a pool worker can enforce the timeout
+    results = []
+    thread = threading.Thread(target=lambda: results.append(processor._process_pdf(path)))
+    thread.start()
+    thread.join()
+    assert len(pools) == 1
+    assert results[0][1]["pages"] == 3 and results[0][1]["timed_out_pages"] == []
@@ -0,0 +1,154 @@
+"""
+Tests for VectorDatabase in the vector_db feature template.
+
+The template imports itself as `app.db`, as in a generated project, so the
+tests copy it into a temporary `app` package.
+"""
+
+import importlib
+import importlib.util
+import os
+import shutil
+import sys
+
+import pytest
+
+TEMPLATE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "run_kit", "templates", "features", "vector_db"
+)
+
+BACKENDS = ["flat", "mmap", "chroma"]
+
+
+@pytest.fixture
+def vector_store(tmp_path, monkeypatch):
+    """Import the vector_db template as app.db.vector_store."""
+    package = tmp_path / "pkg" / "app"
+    shutil.copytree(TEMPLATE_DIR, package / "db", ignore=shutil.ignore_patterns("__pycache__", "*.txt"))
+    (package / "__init__.py").write_text("")
+    (package / "db" / "__init__.py").write_text("")
+    monkeypatch.syspath_prepend(str(tmp_path / "pkg"))
+    for name in [name for name in sys.modules if name == "app" or name.startswith("app.")]:
+        monkeypatch.delitem(sys.modules, name)
+    return importlib.import_module("app.db.vector_store")
+
+
+def _embed(texts):
+    """A small deterministic embedding function: a plain function, as callers pass."""
+    return [[float(len(text)), 1.0, 2.0] for text in texts]
+
+
+def _skip_unavailable(backend):
+    if backend == "chroma" and importlib.util.find_spec("chromadb") is None:
+        pytest.skip("chromadb is not installed")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_text_change_removes_dropped_metadata_keys(vector_store, tmp_path, backend):
+    _skip_unavailable(backend)
+
+    db = vector_store.VectorDatabase(
+        persist_directory=str(tmp_path / "db"),
+        backend=backend,
+        embedding_function=_embed,
+        embedding_cache=False
+    )
+    assert db.upsert_texts(["first text"], [{"source": "a", "page": 1}], ids=["doc"])["added"] == ["doc"]
+
+    report = db.upsert_texts(["edited text"], [{"source": "b"}], ids=["doc"])
+    assert report["updated"] == ["doc"]
+
+    stored = db.get(["doc"])
+    assert stored["documents"] == ["edited text"]
+    metadata = dict(stored["metadatas"][0])
+    metadata.pop(vector_store.CONTENT_HASH_KEY)
+    assert metadata == {"source": "b"}
+
+    # Repeating the same call is a no-op
+    report = db.upsert_texts(["edited text"], [{"source": "b"}], ids=["doc"])
+    assert report["unchanged"] == ["doc"]
+    assert not report["metadata_updated"] and not report["updated"]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_plain_function_embeds_add_and_search(vector_store, tmp_path, backend):
+    _skip_unavailable(backend)
+
+    db = vector_store.VectorDatabase(
+        persist_directory=str(tmp_path / "db"),
+        backend=backend,
+        embedding_function=lambda texts: _embed(texts),
+        embedding_cache=False
+    )
+    assert db.add_texts(["a", "abcdefghijklmnopqrst"], ids=["short", "long"]) == ["short", "long"]
+    assert db.is_available()
+
+    results = db.search("ab", n_results=1)
+    assert results["ids"] == [["short"]]
+    assert results["documents"] == [["a"]]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_re_added_id_replaces_text_in_keyword_index(vector_store, tmp_path, backend):
+    _skip_unavailable(backend)
+
+    db = vector_store.VectorDatabase(
+        persist_directory=str(tmp_path / "db"),
+        backend=backend,
+        embedding_function=_embed,
+        embedding_cache=False,
+        hybrid=True
+    )
+    db.add_texts(["alpha report"], ids=["doc"])
+    db.add_texts(["beta summary"], ids=["doc"])
+
+    assert db.get(["doc"])["documents"] == ["beta summary"]
+    assert db.keyword_index.search("alpha") == []
+    assert [doc_id for doc_id, _ in db.keyword_index.search("beta")] == ["doc"]
+
+
+def test_failed_upsert_does_not_record_near_duplicates(vector_store, tmp_path):
+    db = vector_store.VectorDatabase(
+        persist_directory=str(tmp_path / "db"),
+        backend="flat",
+        embedding_function=_embed,
+        embedding_cache=False
+    )
+    text = "the quarterly report covers revenue, costs and the hiring plan"
+    db.upsert_texts(["an unrelated text about something else"], ids=["other"], skip_near_duplicates=True)
+
+    def _fail(**kwargs):
+        raise OSError("disk full")
+
+    db.collection.upsert = _fail
+    with pytest.raises(OSError):
+        db.upsert_texts([text], ids=["lost"], skip_near_duplicates=True)
+    del db.collection.upsert
+
+    # The failed text was never stored, so it is no near-duplicate of anything
+    report = db.upsert_texts([text, text + "."], ids=["doc", "copy"], skip_near_duplicates=True)
+    assert report["added"] == ["doc"]
+    assert report["near_duplicates"] == ["copy"]
+
+
+@pytest.mark.parametrize("backend", ["auto", "flat", "chroma"])
+def test_quantization_requires_mmap_backend(vector_store, tmp_path, backend):
+    with pytest.raises(ValueError, match="mmap"):
+        vector_store.VectorDatabase(persist_directory=str(tmp_path / "db"), backend=backend, quantization="int8")
+
+
+def test_compact_reclaims_deleted_items(vector_store, tmp_path):
+    db = vector_store.VectorDatabase(
+        persist_directory=str(tmp_path / "db"),
+        backend="mmap",
+        embedding_function=_embed,
+        embedding_cache=False,
+        quantization="int8"
+    )
+    db.add_texts(["a", "abc", "abcdefghij"], ids=["short", "middle", "long"])
+    db.delete(["middle"])
+    db.compact()
+
+    assert db.count() == 2
+    assert db.search("abcdefghi", n_results=2)["ids"] == [["long", "short"]]